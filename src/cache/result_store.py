@@ -0,0 +1,99 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from langchain_core.documents import Document
+
+from src.constants import constants
+
+
+class ResultStore:
+    """
+    A bounded in-memory store of complete search rankings, so further pages of a search are
+    served by slicing the stored ranking instead of re-running the pipeline.
+
+    A cursor names a stored ranking and the offset of the next page. Rankings are immutable
+    once stored, so all pages of a search come from the same ranking. Rankings expire after
+    the TTL, and the oldest ranking is evicted when the store is full.
+
+    Attributes:
+        capacity (int): Maximum number of stored rankings.
+        ttl_seconds (float): Lifetime of a stored ranking.
+        rankings (OrderedDict[str, tuple[float, tuple[Document, ...]]]): Expiry time and ranking
+                                                                         per ranking id, oldest first.
+    """
+
+    def __init__(
+            self,
+            capacity: int = constants.result_store_size,
+            ttl_seconds: float = constants.result_store_ttl_seconds,
+    ):
+        self.capacity = capacity
+        self.ttl_seconds = ttl_seconds
+        self.rankings: OrderedDict[str, tuple[float, tuple[Document, ...]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cursor(ranking_id: str, offset: int) -> str:
+        return f"{ranking_id}:{offset}"
+
+    def _evict(self, now: float):
+        # all rankings live equally long, so the oldest ones expire first
+        while self.rankings and next(iter(self.rankings.values()))[0] <= now:
+            self.rankings.popitem(last=False)
+        while len(self.rankings) > self.capacity:
+            self.rankings.popitem(last=False)
+
+    def first_page(self, ranking: list[Document] | tuple[Document, ...], page_size: int) -> tuple[list[Document], str | None]:
+        """
+        Returns the first page of a ranking and stores the ranking if it has more pages.
+
+        Args:
+            ranking (list[Document] | tuple[Document, ...]): The complete ranking, best first.
+            page_size (int): Number of results per page.
+
+        Returns:
+            tuple[list[Document], str | None]: The first page and the cursor of the next page,
+                                               None if there is no next page.
+        """
+        if len(ranking) <= page_size:
+            return list(ranking), None
+
+        ranking_id = uuid.uuid4().hex
+        now = time.monotonic()
+        with self._lock:
+            self.rankings[ranking_id] = (now + self.ttl_seconds, tuple(ranking))
+            self._evict(now)
+        return list(ranking[:page_size]), self.cursor(ranking_id, page_size)
+
+    def page(self, cursor: str, page_size: int) -> tuple[list[Document], str | None]:
+        """
+        Returns the page a cursor points to.
+
+        Args:
+            cursor (str): A cursor returned with a previous page.
+            page_size (int): Number of results per page.
+
+        Returns:
+            tuple[list[Document], str | None]: The page and the cursor of the next page,
+                                               None if there is no next page.
+
+        Raises:
+            KeyError: If the cursor is malformed or its ranking has expired.
+        """
+        ranking_id, _, offset = cursor.rpartition(":")
+        if not offset.isdigit():
+            raise KeyError(f"Malformed cursor: {cursor}")
+        offset = int(offset)
+
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            if ranking_id not in self.rankings:
+                raise KeyError(f"Unknown or expired cursor: {cursor}")
+            _, ranking = self.rankings[ranking_id]
+
+        end = offset + page_size
+        next_cursor = self.cursor(ranking_id, end) if end < len(ranking) else None
+        return list(ranking[offset:end]), next_cursor
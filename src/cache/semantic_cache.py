@@ -0,0 +1,148 @@
+import threading
+from typing import Any, Hashable
+
+import numpy as np
+
+from src.constants import constants
+
+
+class SemanticQueryCache:
+    """
+    A small in-memory cache of search responses keyed by query embedding.
+
+    The normalized embeddings of the most recent queries are kept as the rows of one matrix,
+    so a lookup is a single matrix-vector product. A lookup hits when a cached query with the
+    same key (e.g. the same filters) has a cosine similarity of at least the threshold, so
+    paraphrases like "chocolatey" and "chocolate notes" share one entry.
+    When the cache is full, the oldest entry is replaced. A key is forgotten once none of
+    its entries is left, so at most capacity keys are tracked.
+
+    Attributes:
+        capacity (int): Maximum number of cached queries, 0 disables the cache.
+        threshold (float): Minimum cosine similarity for a hit.
+        vectors (np.ndarray | None): Normalized query embeddings, one row per slot.
+        key_ids (np.ndarray): Id of the key of each slot, -1 for empty slots.
+        values (list[Any]): Cached value of each slot.
+        hits (int): Number of lookups that were served from the cache.
+        misses (int): Number of lookups that were not.
+    """
+
+    def __init__(
+            self,
+            capacity: int = constants.semantic_cache_size,
+            threshold: float = constants.semantic_cache_threshold,
+    ):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.vectors: np.ndarray | None = None
+        self.key_ids = np.full(capacity, -1, dtype=np.int64)
+        self.values: list[Any] = [None] * capacity
+        self.next_slot = 0
+        self.hits = 0
+        self.misses = 0
+        self._key_id_by_key: dict[Hashable, int] = {}
+        self._key_by_id: dict[int, Hashable] = {}
+        self._entries_by_key_id: dict[int, int] = {}
+        self._next_key_id = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    @staticmethod
+    def _normalize(vector: list[float] | np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def lookup(self, vector: list[float] | np.ndarray, key: Hashable) -> Any | None:
+        """
+        Returns the value of the most similar cached query with the same key.
+
+        Args:
+            vector (list[float] | np.ndarray): The query embedding.
+            key (Hashable): The key that has to match exactly, e.g. the filters.
+
+        Returns:
+            Any | None: The cached value, None on a miss.
+        """
+        if not self.enabled:
+            return None
+        vector = self._normalize(vector)
+        with self._lock:
+            key_id = self._key_id_by_key.get(key)
+            if key_id is None or self.vectors is None:
+                self.misses += 1
+                return None
+            similarities = np.where(self.key_ids == key_id, self.vectors @ vector, -np.inf)
+            slot = int(np.argmax(similarities))
+            if similarities[slot] < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self.values[slot]
+
+    def store(self, vector: list[float] | np.ndarray, key: Hashable, value: Any):
+        """
+        Caches a value for a query embedding, replacing the oldest entry when the cache is full.
+
+        Args:
+            vector (list[float] | np.ndarray): The query embedding.
+            key (Hashable): The key that has to match exactly, e.g. the filters.
+            value (Any): The value to cache.
+        """
+        if not self.enabled:
+            return
+        vector = self._normalize(vector)
+        with self._lock:
+            if self.vectors is None:
+                self.vectors = np.zeros((self.capacity, len(vector)), dtype=np.float32)
+            slot = self.next_slot
+            self._release(int(self.key_ids[slot]))
+            key_id = self._key_id_by_key.get(key)
+            if key_id is None:
+                key_id = self._next_key_id
+                self._next_key_id += 1
+                self._key_id_by_key[key] = key_id
+                self._key_by_id[key_id] = key
+            self._entries_by_key_id[key_id] = self._entries_by_key_id.get(key_id, 0) + 1
+            self.vectors[slot] = vector
+            self.key_ids[slot] = key_id
+            self.values[slot] = value
+            self.next_slot = (slot + 1) % self.capacity
+
+    def _release(self, key_id: int):
+        """
+        Drops one entry of a key, and the key itself once it has no entries left.
+        """
+        if key_id < 0:
+            return
+        remaining = self._entries_by_key_id[key_id] - 1
+        if remaining:
+            self._entries_by_key_id[key_id] = remaining
+        else:
+            del self._entries_by_key_id[key_id]
+            del self._key_id_by_key[self._key_by_id.pop(key_id)]
+
+    def clear(self):
+        """
+        Removes all cached entries.
+        """
+        with self._lock:
+            self.key_ids[:] = -1
+            self.values = [None] * self.capacity
+            self._key_id_by_key.clear()
+            self._key_by_id.clear()
+            self._entries_by_key_id.clear()
+            self.next_slot = 0
+
+    def stats(self) -> dict[str, float]:
+        """
+        Returns the number of hits and misses and the hit rate.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
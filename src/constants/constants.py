@@ -14,4 +14,46 @@ pinecone_api_key = os.getenv("PINECONE_API_KEY")
 google_translate_api_key = os.getenv("GOOGLE_API_KEY")
 es_url = os.getenv("ES_URL")
 es_api_key = os.getenv("ES_API_KEY")
-es_index_name = os.getenv("ES_INDEX_NAME")
\ No newline at end of file
+es_index_name = os.getenv("ES_INDEX_NAME")
+
+log_json = os.getenv("LOG_JSON", "false").lower() == "true"
+log_max_bytes = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+log_backup_count = int(os.getenv("LOG_BACKUP_COUNT", 5))
+log_sample_rate = float(os.getenv("LOG_SAMPLE_RATE", 0.1))
+
+index_gc_grace_seconds = float(os.getenv("INDEX_GC_GRACE_SECONDS", 30))
+
+retrieval_backend = os.getenv("RETRIEVAL_BACKEND", "remote")
+num_shards = int(os.getenv("NUM_SHARDS", os.cpu_count() or 1))
+
+similar_k = int(os.getenv("SIMILAR_K", 20))
+
+semantic_cache_size = int(os.getenv("SEMANTIC_CACHE_SIZE", 256))
+semantic_cache_threshold = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.92))
+
+startup_import_budget_ms = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", 1500))
+
+result_store_size = int(os.getenv("RESULT_STORE_SIZE", 1024))
+result_store_ttl_seconds = float(os.getenv("RESULT_STORE_TTL_SECONDS", 600))
+
+embedding_backend = os.getenv("EMBEDDING_BACKEND", "torch")
+onnx_model_dir = os.path.join(root_dir, "models", "onnx")
+onnx_intra_op_threads = int(os.getenv("ONNX_INTRA_OP_THREADS", os.cpu_count() or 1))
+onnx_batch_size = int(os.getenv("ONNX_BATCH_SIZE", 32))
+
+embedding_store_dir = os.path.join(root_dir, "db", "embeddings")
+
+max_concurrent_requests = int(os.getenv("MAX_CONCURRENT_REQUESTS", 8))
+max_queued_requests = int(os.getenv("MAX_QUEUED_REQUESTS", 32))
+queue_timeout_seconds = float(os.getenv("QUEUE_TIMEOUT_SECONDS", 2.0))
+
+mmr_lambda = float(os.getenv("MMR_LAMBDA", 0.7))
+
+quantization_mode = os.getenv("QUANTIZATION_MODE", "int8")
+quantization_rescore = int(os.getenv("QUANTIZATION_RESCORE", 300))
+quantized_index_dir = os.path.join(root_dir, "db", "quantized")
+
+reranker_model = os.getenv("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+rerank_top_n = int(os.getenv("RERANK_TOP_N", 0))
+rerank_budget_ms = float(os.getenv("RERANK_BUDGET_MS", 150))
+rerank_cache_size = int(os.getenv("RERANK_CACHE_SIZE", 4096))
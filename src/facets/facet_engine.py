@@ -0,0 +1,204 @@
+import threading
+
+import numpy as np
+from langchain_core.documents import Document
+
+
+
+def popcount(words: np.ndarray) -> np.ndarray:
+    """
+    Counts the set bits of every uint64 word (SWAR bit counting).
+    """
+    words = words - ((words >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    words = (words & np.uint64(0x3333333333333333)) + ((words >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    words = (words + (words >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return (words * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+
+class FacetEngine:
+    """
+    Keeps one bitmap of uint64 words per facet value over the catalog positions of an index generation,
+    so facet counts for any candidate set are a few bitmap intersections and popcounts.
+
+    Bit p of a bitmap belongs to the document at position p of the catalog. Counts of a field
+    honour the filters on all other fields, so every count is the number of results the user
+    gets when picking that value.
+
+    Attributes:
+        fields (tuple[str, ...]): Metadata fields with one bitmap per distinct value.
+        bucket_fields (dict[str, list[tuple[float, str]]]): Numeric fields with bucket upper bounds and labels.
+        size (int): Number of catalog positions.
+        bitmaps (dict[str, dict[str, np.ndarray]]): Packed bitmap per field and value.
+    """
+
+    fields = ("roast", "origin_1", "origin_2", "loc_country")
+    bucket_fields = {
+        "100g_USD": [(5.0, "< $5"), (10.0, "$5-10"), (20.0, "$10-20"), (50.0, "$20-50"), (float("inf"), "$50+")],
+        "rating": [(88.0, "< 88"), (91.0, "88-90"), (93.0, "91-92"), (95.0, "93-94"), (float("inf"), "95+")],
+    }
+
+    def __init__(self, documents: list[Document]):
+        """
+        Builds the bitmaps for the catalog.
+
+        Args:
+            documents (list[Document]): The catalog, in position order.
+        """
+        self.size = len(documents)
+        self.capacity = max(self.size, 64)
+        self._lock = threading.Lock()
+        self.bitmaps: dict[str, dict[str, np.ndarray]] = {}
+        self.values: dict[str, list[str | None]] = {}
+        self._matrices: dict[str, tuple[list[str], np.ndarray]] = {}
+
+        for field in (*self.fields, *self.bucket_fields):
+            values = [self.facet_value(field, doc) for doc in documents]
+            column = np.array([value or "" for value in values], dtype=object)
+            self.values[field] = values
+            self.bitmaps[field] = {
+                value: self._pack(column == value) for value in set(values) if value
+            }
+
+    def facet_value(self, field: str, doc: Document) -> str | None:
+        """
+        Returns the facet value of a document, bucketing numeric fields.
+        """
+        value = doc.metadata.get(field)
+        if value is None or value == "":
+            return None
+        if field not in self.bucket_fields:
+            return str(value)
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return None
+        return next(label for upper, label in self.bucket_fields[field] if number < upper)
+
+    @property
+    def num_words(self) -> int:
+        return (self.capacity + 63) // 64
+
+    def _pack(self, mask: np.ndarray) -> np.ndarray:
+        padded = np.zeros(self.num_words * 64, dtype=bool)
+        padded[:len(mask)] = mask
+        return np.packbits(padded, bitorder="little").view("<u8")
+
+    def _grow(self):
+        self.capacity *= 2
+        self._matrices.clear()
+        for field_bitmaps in self.bitmaps.values():
+            for value, bitmap in field_bitmaps.items():
+                field_bitmaps[value] = np.concatenate([bitmap, np.zeros(self.num_words - len(bitmap), dtype=np.uint64)])
+
+    def _set_bit(self, field: str, value: str | None, position: int, on: bool):
+        if not value:
+            return
+        field_bitmaps = self.bitmaps[field]
+        self._matrices.pop(field, None)
+        if value not in field_bitmaps:
+            field_bitmaps[value] = np.zeros(self.num_words, dtype=np.uint64)
+        bit = np.uint64(1) << np.uint64(position & 63)
+        if on:
+            field_bitmaps[value][position >> 6] |= bit
+        else:
+            field_bitmaps[value][position >> 6] &= ~bit
+
+    def set_document(self, position: int, doc: Document | None):
+        """
+        Sets or clears the facet values of one catalog position.
+        Appending at position == size grows the catalog, clearing the last position shrinks it.
+
+        Args:
+            position (int): The catalog position.
+            doc (Document | None): The document now at this position, None to clear it.
+        """
+        with self._lock:
+            if position >= self.capacity:
+                self._grow()
+            for field, values in self.values.items():
+                if position < len(values):
+                    self._set_bit(field, values[position], position, on=False)
+                else:
+                    values.append(None)
+                value = self.facet_value(field, doc) if doc is not None else None
+                values[position] = value
+                self._set_bit(field, value, position, on=True)
+
+            if doc is not None:
+                self.size = max(self.size, position + 1)
+            elif position == self.size - 1:
+                self.size -= 1
+                for values in self.values.values():
+                    del values[position:]
+
+    def positions_bitmap(self, positions: list[int]) -> np.ndarray:
+        """
+        Packs a list of catalog positions into a bitmap.
+        """
+        mask = np.zeros(self.num_words * 64, dtype=bool)
+        mask[np.asarray(positions, dtype=np.int64)] = True
+        return np.packbits(mask, bitorder="little").view("<u8")
+
+    def _matrix(self, field: str) -> tuple[list[str], np.ndarray]:
+        """
+        Returns the values of a field and their bitmaps stacked into one matrix, cached until the field changes.
+        """
+        if field not in self._matrices:
+            values = list(self.bitmaps[field])
+            matrix = np.stack([self.bitmaps[field][value] for value in values])
+            self._matrices[field] = (values, matrix)
+        return self._matrices[field]
+
+    def _filter_bitmap(self, field: str, value: str) -> np.ndarray | None:
+        for candidate, bitmap in self.bitmaps[field].items():
+            if candidate.lower() == str(value).lower():
+                return bitmap
+        return None
+
+    def counts(
+            self,
+            filters: dict[str, str] | None = None,
+            positions: list[int] | None = None,
+    ) -> dict[str, dict[str, int]]:
+        """
+        Counts the documents per facet value within the candidate set.
+
+        Args:
+            filters (dict[str, str], optional): Active filters. Filters on facet fields narrow
+                                                the counts of all other facet fields.
+            positions (list[int], optional): Catalog positions of the candidates.
+                                             Defaults to the whole catalog.
+
+        Returns:
+            dict[str, dict[str, int]]: Non-zero counts per field and value, most frequent first.
+        """
+        filters = filters or {}
+        with self._lock:
+            if positions is None:
+                base = self._pack(np.ones(self.size, dtype=bool))
+            else:
+                base = self.positions_bitmap(positions)
+
+            filter_bitmaps = {}
+            for field, value in filters.items():
+                if field in self.bitmaps:
+                    bitmap = self._filter_bitmap(field, value)
+                    filter_bitmaps[field] = bitmap if bitmap is not None else np.zeros_like(base)
+
+            result = {}
+            for field, field_bitmaps in self.bitmaps.items():
+                mask = base
+                for other_field, bitmap in filter_bitmaps.items():
+                    if other_field != field:
+                        mask = mask & bitmap
+                if not field_bitmaps:
+                    result[field] = {}
+                    continue
+                values, matrix = self._matrix(field)
+                # only the words that contain candidates can contribute to the counts
+                words = np.flatnonzero(mask)
+                totals = popcount(matrix[:, words] & mask[words]).sum(axis=1, dtype=np.int64)
+                non_zero = np.flatnonzero(totals)
+                order = non_zero[np.argsort(-totals[non_zero], kind="stable")]
+                result[field] = dict(zip([values[i] for i in order], totals[order].tolist()))
+            return result
@@ -1,13 +1,20 @@
 import os
 import re
 from logging import Logger
+from typing import TYPE_CHECKING
 
-import pandas as pd
 from src.constants import constants
 from src.logger.custom_logger import CustomLogger
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 class DataLoader:
+    # ratings of the dataset lie between these bounds, rating_score maps them to [0, 1]
+    min_rating = 80.0
+    max_rating = 100.0
+
     def __init__(self):
         """
         Initializes the DataLoader with the specified directory and a logger.
@@ -17,17 +24,52 @@ class DataLoader:
         self.log_dir = os.path.join(constants.root_dir, "logs")
         self.logger = CustomLogger(self.log_dir, "logs.log").logger
 
-    def load_coffee_data(self) -> pd.DataFrame:
+    def load_coffee_data(self) -> "pd.DataFrame":
         """
         Loads a CSV file with columns:
         name, roaster, roast, loc_country, origin, 100g_USD, rating, review_date, review
 
         Handles quoted fields (especially the 'review' column, which may contain commas).
+        The business signals used for ranking are parsed once here, see add_business_signals.
         """
+        import pandas as pd
         df = pd.read_csv(self.dataset_path, quotechar='"', encoding='utf-8')
+        return self.add_business_signals(df)
+
+    def add_business_signals(self, df: "pd.DataFrame") -> "pd.DataFrame":
+        """
+        Adds the float32 columns the business-signal ranking reads, so no rating, price or
+        date has to be parsed at query time:
+        rating_score (rating scaled to [0, 1]), log_price (log of 1 + 100g_USD) and
+        review_year (review_date as a fractional year, e.g. "November 2017" -> 2017.83).
+        Unparseable values become NaN.
+
+        Args:
+            df (pd.DataFrame): Rows with the columns of the coffee dataset.
+
+        Returns:
+            pd.DataFrame: The same rows with the signal columns added.
+        """
+        import numpy as np
+        import pandas as pd
+
+        df = df.copy()
+        missing = pd.Series(np.nan, index=df.index)
+        rating = pd.to_numeric(df.get("rating", missing), errors="coerce")
+        df["rating_score"] = ((rating - self.min_rating) / (self.max_rating - self.min_rating)).clip(0, 1).astype(np.float32)
+
+        price = pd.to_numeric(df.get("100g_USD", missing), errors="coerce")
+        df["log_price"] = np.log1p(price.clip(lower=0)).astype(np.float32)
+
+        review_date = pd.to_datetime(df.get("review_date", missing), format="%B %Y", errors="coerce")
+        df["review_year"] = (review_date.dt.year + (review_date.dt.month - 1) / 12).astype(np.float32)
+
+        num_unparsed = int(df["review_year"].isna().sum())
+        if num_unparsed:
+            self.logger.warning(f"Could not parse the review date of {num_unparsed} rows.")
         return df
 
-    def calculate_hyperlink_percentage(self, df: pd.DataFrame) -> float:
+    def calculate_hyperlink_percentage(self, df: "pd.DataFrame") -> float:
         """
         Analyzes the DataFrame and calculates the percentage of rows that contain
         at least one hyperlink in 'desc_1', 'desc_2', or 'desc_3'.
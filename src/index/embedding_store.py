@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.constants import constants
+from src.logger.custom_logger import CustomLogger
+
+
+class EmbeddingStore:
+    """
+    A persistent, content-addressed store of document embeddings of one embedding model.
+
+    Embeddings are keyed by the SHA-256 of the text. They are appended to a raw float32 file
+    that is read through a memory map, and the digests are appended in the same order to an
+    index file, so row i of the data file belongs to digest i. The data is written before the
+    index and the metadata last, so an interrupted write leaves at most unreferenced rows behind.
+
+    Attributes:
+        model_id (str): Identifier of the embedding model, e.g. "torch:sentence-transformers/all-mpnet-base-v2".
+        data_path (str): Path of the float32 data file.
+        index_path (str): Path of the digest index file.
+        dimension (int | None): Embedding dimension, None until the first embedding is stored.
+        rows (dict[bytes, int]): Row of each stored digest.
+    """
+
+    digest_size = hashlib.sha256().digest_size
+
+    def __init__(self, model_id: str, directory: str = constants.embedding_store_dir):
+        self.log_dir = os.path.join(constants.root_dir, "logs")
+        self.logger = CustomLogger(self.log_dir, "logs.log").logger
+        self.model_id = model_id
+        os.makedirs(directory, exist_ok=True)
+        slug = hashlib.sha256(model_id.encode("utf-8")).hexdigest()[:16]
+        self.data_path = os.path.join(directory, f"{slug}.f32")
+        self.index_path = os.path.join(directory, f"{slug}.idx")
+        self.meta_path = os.path.join(directory, f"{slug}.json")
+        self.dimension: int | None = None
+        self.rows: dict[bytes, int] = {}
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def digest(text: str) -> bytes:
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+    def _load(self):
+        if not os.path.exists(self.meta_path):
+            return
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            self.dimension = json.load(f)["dimension"]
+
+        # a store written by an older version may have its metadata without data or index
+        index = b""
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as f:
+                index = f.read()
+        data_size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        num_rows = min(len(index) // self.digest_size, data_size // (4 * self.dimension))
+        self.rows = {
+            index[row * self.digest_size:(row + 1) * self.digest_size]: row for row in range(num_rows)
+        }
+        self._map(num_rows)
+        self.logger.info(f"Loaded {num_rows} stored embeddings of {self.model_id}.")
+
+    def _map(self, num_rows: int):
+        if num_rows:
+            self._vectors = np.memmap(self.data_path, dtype=np.float32, mode="r", shape=(num_rows, self.dimension))
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def get_matrix(self, texts: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Looks up the stored embeddings of texts with one read from the memory map.
+
+        Args:
+            texts (list[str]): The texts.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: A float32 matrix with the embedding of each text
+                                           (zeros if not stored) and a mask of the stored texts.
+        """
+        digests = [self.digest(text) for text in texts]
+        with self._lock:
+            rows = np.array([self.rows.get(digest, -1) for digest in digests], dtype=np.int64)
+            vectors, dimension = self._vectors, self.dimension
+        # the rows of a mapped snapshot are never rewritten, so it is read outside the lock
+        found = (rows >= 0) & (rows < len(vectors))
+        matrix = np.zeros((len(texts), dimension or 0), dtype=np.float32)
+        if found.any():
+            matrix[found] = vectors[rows[found]]
+        return matrix, found
+
+    def put_many(self, texts: list[str], vectors: list[list[float]] | np.ndarray):
+        """
+        Appends the embeddings of texts that are not stored yet.
+
+        Args:
+            texts (list[str]): The texts.
+            vectors (list[list[float]] | np.ndarray): Their embeddings, in the same order.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            new = {}
+            for text, vector in zip(texts, vectors):
+                digest = self.digest(text)
+                if digest not in self.rows and digest not in new:
+                    new[digest] = vector
+            if not new:
+                return
+
+            write_meta = self.dimension is None
+            if write_meta:
+                self.dimension = vectors.shape[1]
+
+            # drop rows of an interrupted write, so rows and digests stay aligned
+            num_rows = len(self.rows)
+            with open(self.data_path, "ab") as f:
+                f.truncate(num_rows * 4 * self.dimension)
+                f.write(np.stack(list(new.values())).astype(np.float32).tobytes())
+            with open(self.index_path, "ab") as f:
+                f.truncate(num_rows * self.digest_size)
+                f.write(b"".join(new))
+            if write_meta:
+                with open(self.meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"model_id": self.model_id, "dimension": self.dimension}, f)
+
+            for row, digest in enumerate(new, start=num_rows):
+                self.rows[digest] = row
+            self._map(len(self.rows))
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings that consult an EmbeddingStore before calling the model, so unchanged texts
+    are never embedded twice, across rebuilds, namespaces and retrieval backends.
+    Query embeddings are not stored.
+
+    Attributes:
+        model (Embeddings): The embedding model.
+        store (EmbeddingStore): The persistent embeddings of the model.
+        hits (int): Number of texts served from the store.
+        misses (int): Number of texts embedded by the model.
+    """
+
+    def __init__(self, model: Embeddings, store: EmbeddingStore):
+        self.model = model
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_documents_matrix(texts).tolist()
+
+    def embed_documents_matrix(self, texts: list[str]) -> np.ndarray:
+        """
+        Embeds texts like embed_documents, but returns one float32 matrix with a row per text.
+        """
+        matrix, found = self.store.get_matrix(texts)
+        missing_positions = np.flatnonzero(~found)
+        missing = sorted({texts[i] for i in missing_positions})
+        self.hits += len(texts) - len(missing_positions)
+        self.misses += len(missing)
+
+        if missing:
+            embedded = np.asarray(self.model.embed_documents(missing), dtype=np.float32)
+            self.store.put_many(missing, embedded)
+            if matrix.shape[1] != embedded.shape[1]:
+                matrix = np.zeros((len(texts), embedded.shape[1]), dtype=np.float32)
+            position_of = {text: position for position, text in enumerate(missing)}
+            matrix[missing_positions] = embedded[[position_of[texts[i]] for i in missing_positions]]
+        return matrix
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.model.embed_query(text)
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """
+        Embeds a batch of queries in one model call, without reading or writing the store.
+        """
+        return self.model.embed_documents(texts)
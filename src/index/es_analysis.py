@@ -0,0 +1,87 @@
+"""
+Analysis settings and mappings of the ElasticSearch index.
+
+Typo tolerance is built in at index time: every description field is indexed with English
+stemming, and the flavor description additionally with trigram and edge-n-gram subfields.
+A misspelled or partially typed term then still shares most of its n-grams with the correct
+term, without expanding each query term into fuzzy automata at search time.
+"""
+
+# Equivalent tasting terms, applied to queries only
+TASTING_SYNONYMS = [
+    "chocolate, chocolaty, chocolatey, cocoa, cacao",
+    "caramel, caramelly, caramelized, toffee",
+    "floral, flowery, blossom",
+    "fruity, fruit, fruit-toned",
+    "berry, berries, berry-toned",
+    "citrus, citrusy",
+    "nutty, nut",
+    "honey, honeyed",
+    "smoky, smoke",
+    "earthy, earth",
+    "spicy, spice, spiced",
+    "winy, winey, wine-like, wine",
+    "syrupy, syrup",
+    "jammy, jam",
+    "creamy, cream",
+    "juicy, succulent",
+    "toasty, toasted, roasty",
+    "acidity, acidic, tart",
+    "sweet, sweetness, sugary",
+    "molasses, treacle",
+]
+
+ANALYSIS = {
+    "filter": {
+        "english_stop": {"type": "stop", "stopwords": "_english_"},
+        "english_stemmer": {"type": "stemmer", "language": "english"},
+        "english_possessive_stemmer": {"type": "stemmer", "language": "possessive_english"},
+        "tasting_synonyms": {"type": "synonym_graph", "synonyms": TASTING_SYNONYMS},
+        "trigram_filter": {"type": "ngram", "min_gram": 3, "max_gram": 3},
+        "edge_ngram_filter": {"type": "edge_ngram", "min_gram": 2, "max_gram": 15},
+    },
+    "analyzer": {
+        "english_index": {
+            "tokenizer": "standard",
+            "filter": ["english_possessive_stemmer", "lowercase", "english_stop", "english_stemmer"],
+        },
+        "english_search": {
+            "tokenizer": "standard",
+            "filter": [
+                "english_possessive_stemmer", "lowercase", "tasting_synonyms", "english_stop", "english_stemmer",
+            ],
+        },
+        "trigram": {"tokenizer": "standard", "filter": ["lowercase", "trigram_filter"]},
+        "edge_ngram_index": {"tokenizer": "standard", "filter": ["lowercase", "edge_ngram_filter"]},
+        "edge_ngram_search": {"tokenizer": "standard", "filter": ["lowercase"]},
+    },
+}
+
+
+def english_text_field(with_ngrams: bool = False) -> dict:
+    """
+    Returns the mapping of a description field.
+
+    Args:
+        with_ngrams (bool): Whether to add the trigram and edge-n-gram subfields.
+
+    Returns:
+        dict: The field mapping.
+    """
+    field = {"type": "text", "analyzer": "english_index", "search_analyzer": "english_search"}
+    if with_ngrams:
+        field["fields"] = {
+            "trigram": {"type": "text", "analyzer": "trigram"},
+            "edge": {"type": "text", "analyzer": "edge_ngram_index", "search_analyzer": "edge_ngram_search"},
+        }
+    return field
+
+
+# Fields of the lexical query with their weights
+SEARCH_FIELDS = [
+    "flavor_description^3",
+    "flavor_description.edge^1.5",
+    "flavor_description.trigram^0.5",
+    "desc_2^1",
+    "desc_3^0.5",
+]
@@ -1,14 +1,24 @@
 from logging import Logger
 import os
-from pathlib import Path
+import threading
+import time
+from typing import TYPE_CHECKING
 
-from langchain.indexes import SQLRecordManager, index
 from langchain_core.documents import Document
 from src.logger.custom_logger import CustomLogger
 from src.constants import constants
+from src.index import es_analysis
 from src.index.data_loader import DataLoader
+from src.index.index_generation import IndexGeneration
+from src.index.record_store import RecordStore
+from src.index.review_log import ReviewLog
 from src.index.vector_store import VectorStore
-from elasticsearch import Elasticsearch, helpers
+from src.retrieve.quantized_index import QuantizedVectorIndex
+from src.retrieve.sharded_index import ShardedIndex
+from src.similar.neighbor_graph import NeighborGraph
+
+if TYPE_CHECKING:
+    from elasticsearch import Elasticsearch
 
 
 class Index:
@@ -16,14 +26,26 @@ class Index:
     A class to manage the index of documents, including loading data,
     splitting markdown files into chunks, and adding those chunks to an index.
 
+    All searchable state lives in an IndexGeneration. Full rebuilds are written into a
+    shadow generation and swapped in atomically once verified, so searches never see
+    a half-written index.
+
     Attributes:
         log_dir (str): Directory where logs are stored.
         logger (CustomLogger): logger instance for logging information and errors.
-        record_manager (SQLRecordManager): Manages the records in the SQL database.
-        vector_store (PineconeVectorStore): Vector store instance for managing embeddings.
         data_loader (DataLoader): Instance to load data from the data directory.
+        es_index_name (str): Name of the ElasticSearch alias that searches are sent to.
+        vector_store_manager (VectorStore): Creates the vector stores of each generation.
+        active (IndexGeneration): The generation that currently serves searches.
+        generation (int): Counter that is bumped on every write to the index.
+        review_log (ReviewLog): Persistent log of the single review writes, replayed on the
+                                dataset whenever a generation is loaded.
     """
 
+    record_manager_namespace = "coffee_beans_large"
+    required_review_fields = ("name", "desc_1")
+    numeric_review_fields = ("100g_USD", "rating")
+
     def __init__(self):
         """
         Initializes the Index class, setting up the logger, record manager, vector store,
@@ -36,48 +58,72 @@ class Index:
         self.logger.info("Initializing Index class...")
         self.data_loader = DataLoader()
 
-        self.elastic_search = Elasticsearch(
+        self.generation = 0
+        self._write_lock = threading.Lock()
+        self.review_log = ReviewLog(os.path.join(constants.root_dir, "db", "review_log.sql"))
+
+        from elasticsearch import Elasticsearch
+        self.elastic_search: "Elasticsearch" = Elasticsearch(
             constants.es_url,
             api_key=constants.es_api_key
         )
         self.es_index_name = constants.es_index_name
 
-        self.create_es_index_if_missing()
+        self.vector_store_manager = VectorStore()
+        self.active = self.create_generation(self.resolve_active_generation())
+        if not self.elastic_search.indices.exists(index=self.es_index_name):
+            self.elastic_search.indices.put_alias(index=self.active.es_index_name, name=self.es_index_name)
+        self.logger.info(f"Index class initialized successfully with generation {self.active.number}.")
+
+    @property
+    def vector_store(self):
+        return self.active.vector_store
+
+    @property
+    def record_manager(self) -> RecordStore:
+        return self.active.record_manager
 
-        self.record_manager = self.initialize_record_manager(self.logger)
-        self.vector_store = VectorStore().create_vectorstore()
-        self.logger.info("Index class initialized successfully.")
+    @property
+    def chunks(self) -> list[Document]:
+        return self.active.chunks
 
     @staticmethod
-    def initialize_record_manager(logger: Logger) -> SQLRecordManager:
+    def initialize_record_manager(logger: Logger, namespace: str = record_manager_namespace) -> RecordStore:
         """
-        Initializes the SQLRecordManager with a specified namespace and database URL.
+        Initializes the RecordStore with a specified namespace and database path.
+
+        Args:
+            logger (Logger): Logger instance.
+            namespace (str): The record manager namespace.
 
         Returns:
-            SQLRecordManager: The initialized SQLRecordManager instance.
-        """
-        namespace = "coffee_beans_large"
-        db_dir = os.path.join(constants.root_dir, "db", "record_manager_cache_large.sql")
-        db_path = Path(db_dir).as_posix()
-        db_url = f'sqlite:///{db_path}'
-        record_manager = SQLRecordManager(
-            namespace, db_url=db_url
-        )
+            RecordStore: The initialized RecordStore instance.
+        """
+        db_path = os.path.join(constants.root_dir, "db", "record_manager_cache_large.sql")
+        record_manager = RecordStore(namespace, db_path=db_path)
 
         record_manager.create_schema()
-        logger.info(f"SQLRecordManager initialized with namespace: {namespace}")
+        logger.info(f"RecordStore initialized with namespace: {namespace}")
         return record_manager
 
-    def create_es_index_if_missing(self):
-        if not self.elastic_search.indices.exists(index=self.es_index_name):
-            self.logger.info(f"Creating ElasticSearch index: {self.es_index_name}")
+    def create_es_index_if_missing(self, index_name: str | None = None):
+        """
+        Creates an ElasticSearch index with the custom analyzers and mappings of es_analysis.
+
+        Args:
+            index_name (str, optional): The index to create. Defaults to the alias name.
+        """
+        index_name = index_name or self.es_index_name
+        if not self.elastic_search.indices.exists(index=index_name):
+            self.logger.info(f"Creating ElasticSearch index: {index_name}")
 
             mappings = {
+                "settings": {"analysis": es_analysis.ANALYSIS},
                 "mappings": {
                     "properties": {
-                        "flavor_description": {"type": "text"},
-                        "desc_2": {"type": "text"},
-                        "desc_3": {"type": "text"},
+                        "flavor_description": es_analysis.english_text_field(with_ngrams=True),
+                        "desc_2": es_analysis.english_text_field(),
+                        "desc_3": es_analysis.english_text_field(),
                         "name": {"type": "keyword"},
                         "roaster": {"type": "keyword"},
                         "roast": {"type": "keyword"},
@@ -92,8 +138,62 @@ class Index:
                 }
             }
 
-            self.elastic_search.indices.create(index=self.es_index_name, body=mappings)
-            self.logger.info(f"Index and mappings created for: {self.es_index_name}")
+            self.elastic_search.indices.create(index=index_name, body=mappings)
+            self.logger.info(f"Index and mappings created for: {index_name}")
+
+    def generation_names(self, number: int) -> tuple[str, str | None, str]:
+        """
+        Returns the backend names used by a generation. Generation 0 maps to the
+        un-versioned names used before generations were introduced.
+
+        Args:
+            number (int): The generation number.
+
+        Returns:
+            tuple[str, str | None, str]: ElasticSearch index, Pinecone namespace and record manager namespace.
+        """
+        if number == 0:
+            return self.es_index_name, None, self.record_manager_namespace
+        return (
+            f"{self.es_index_name}_gen{number}",
+            f"gen{number}",
+            f"{self.record_manager_namespace}_gen{number}",
+        )
+
+    def resolve_active_generation(self) -> int:
+        """
+        Determines the serving generation from the index the ElasticSearch alias points to.
+
+        Returns:
+            int: The active generation number.
+        """
+        if self.elastic_search.indices.exists_alias(name=self.es_index_name):
+            physical_index = next(iter(self.elastic_search.indices.get_alias(name=self.es_index_name)))
+            return int(physical_index.rsplit("_gen", 1)[1])
+        if self.elastic_search.indices.exists(index=self.es_index_name):
+            # a concrete index with the alias name is the legacy generation
+            return 0
+        return 1
+
+    def create_generation(self, number: int) -> IndexGeneration:
+        """
+        Creates (or attaches to) the backends of a generation.
+
+        Args:
+            number (int): The generation number.
+
+        Returns:
+            IndexGeneration: The generation with an empty catalog.
+        """
+        es_index_name, namespace, record_manager_namespace = self.generation_names(number)
+        self.create_es_index_if_missing(es_index_name)
+        return IndexGeneration(
+            number=number,
+            es_index_name=es_index_name,
+            namespace=namespace,
+            record_manager=self.initialize_record_manager(self.logger, record_manager_namespace),
+            vector_store=self.vector_store_manager.create_vectorstore(namespace),
+        )
 
     def row_to_document(self, row, idx=None) -> Document:
         row_clean = row.fillna("")
@@ -104,7 +204,52 @@ class Index:
 
         return Document(page_content=page_content, metadata=metadata)
 
-    def add_to_elasticsearch(self, documents: list[Document]):
+    def review_to_document(self, review: dict, source: str) -> Document:
+        """
+        Converts the fields of a single review into a Document with the parsed business signals.
+
+        Args:
+            review (dict): The review fields, using the columns of the coffee dataset.
+            source (str): The source id of the review.
+
+        Returns:
+            Document: The review document.
+        """
+        import pandas as pd
+        row = self.data_loader.add_business_signals(pd.DataFrame([review])).iloc[0]
+        document = self.row_to_document(row)
+        document.metadata["source"] = source
+        return document
+
+    @staticmethod
+    def document_to_es_body(doc: Document) -> dict:
+        """
+        Converts a Document into the body stored in the ElasticSearch index.
+
+        Args:
+            doc (Document): The review document.
+
+        Returns:
+            dict: The ElasticSearch document body.
+        """
+        return {
+            "flavor_description": doc.page_content,
+            "desc_2": doc.metadata.get("desc_2", ""),
+            "desc_3": doc.metadata.get("desc_3", ""),
+            "name": doc.metadata.get("name", ""),
+            "roaster": doc.metadata.get("roaster", ""),
+            "roast": doc.metadata.get("roast", ""),
+            "loc_country": doc.metadata.get("loc_country", ""),
+            "origin_1": doc.metadata.get("origin_1", ""),
+            "origin_2": doc.metadata.get("origin_2", ""),
+            "100g_USD": doc.metadata.get("100g_USD", 0.0),
+            "rating": doc.metadata.get("rating", 0.0),
+            "review_date": doc.metadata.get("review_date", ""),
+            "source": doc.metadata.get("source"),
+        }
+
+    def add_to_elasticsearch(self, documents: list[Document], index_name: str | None = None):
+        index_name = index_name or self.active.es_index_name
         actions = []
 
         for doc in documents:
@@ -112,70 +257,233 @@ class Index:
             if not doc_id:
                 continue
 
-            doc_body = {
-                "flavor_description": doc.page_content,
-                "desc_2": doc.metadata.get("desc_2", ""),
-                "desc_3": doc.metadata.get("desc_3", ""),
-                "name": doc.metadata.get("name", ""),
-                "roaster": doc.metadata.get("roaster", ""),
-                "roast": doc.metadata.get("roast", ""),
-                "loc_country": doc.metadata.get("loc_country", ""),
-                "origin_1": doc.metadata.get("origin_1", ""),
-                "origin_2": doc.metadata.get("origin_2", ""),
-                "100g_USD": doc.metadata.get("100g_USD", 0.0),
-                "rating": doc.metadata.get("rating", 0.0),
-                "review_date": doc.metadata.get("review_date", ""),
-                "source": doc_id,
-            }
-
             actions.append({
-                "_index": self.es_index_name,
+                "_index": index_name,
                 "_id": doc_id,
-                "_source": doc_body,
+                "_source": self.document_to_es_body(doc),
             })
 
         if actions:
+            from elasticsearch import helpers
             helpers.bulk(self.elastic_search, actions)
             self.logger.info(f"Indexed {len(actions)} structured docs into Elastic Cloud.")
 
-    def add_chunk_to_index(self, chunk_doc: list[Document]):
+    def add_chunk_to_index(self, chunk_doc: list[Document], generation: IndexGeneration | None = None):
         """
         Adds a list of document chunks to the index.
 
         Args:
             chunk_doc (list[Document]): A list of Document objects to be added to the index.
+            generation (IndexGeneration, optional): The generation to write to. Defaults to the active one.
         """
+        generation = generation or self.active
         try:
             self.logger.info("Adding document chunks to the index...")
-            index(
+            from langchain.indexes import index
+            start = time.perf_counter()
+            result = index(
                 chunk_doc,
-                self.record_manager,
-                self.vector_store,
+                generation.record_manager,
+                generation.vector_store,
                 cleanup="incremental",
                 source_id_key="source"
             )
-            self.logger.info("Document chunks added to the index successfully.")
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.logger.info(f"Document chunks added to the index successfully in {elapsed_ms:.1f} ms: {result}")
         except Exception as e:
             self.logger.error(f"Failed to add chunks to the index: {e}")
             raise
 
+    def load_generation(self, generation: IndexGeneration, previous: IndexGeneration | None = None):
+        """
+        Loads coffee data, converts rows to Documents (embedding only the review),
+        replays the logged single review writes on them and indexes them into the given generation.
+
+        Args:
+            generation (IndexGeneration): The generation to fill.
+            previous (IndexGeneration, optional): The generation a rebuild replaces. Reviews it holds
+                                                  that are neither in the dataset nor in the review
+                                                  log are copied over. Defaults to the generation itself.
+        """
+        df = self.data_loader.load_coffee_data()
+
+        documents = self.review_log.apply([
+            self.row_to_document(row, idx)
+            for idx, (_, row) in enumerate(df.iterrows())
+        ])
+        documents.extend(self.recover_unlogged_reviews(previous or generation, documents))
+
+        self.add_chunk_to_index(documents, generation)
+        self.add_to_elasticsearch(documents, generation.es_index_name)
+        generation.set_catalog(documents, next_review_id=self.next_free_review_id(generation, len(df)))
+
+        if constants.retrieval_backend == "quantized":
+            self.build_quantized_index(generation)
+        if constants.retrieval_backend == "sharded":
+            self.build_shards(generation)
+        if constants.similar_k > 0:
+            self.build_neighbor_graph(generation)
+
+    def recover_unlogged_reviews(self, generation: IndexGeneration, documents: list[Document]) -> list[Document]:
+        """
+        Recovers reviews that a generation holds but neither the dataset nor the review log know,
+        i.e. reviews upserted before writes were logged. They are read back from ElasticSearch
+        and added to the review log, so later generations keep them as well.
+
+        Args:
+            generation (IndexGeneration): The generation to recover the reviews of.
+            documents (list[Document]): The catalog loaded from the dataset and the review log.
+
+        Returns:
+            list[Document]: The recovered reviews.
+        """
+        known = {document.metadata["source"] for document in documents}
+        unlogged = [source for source in generation.record_manager.list_group_ids() if source not in known]
+        if not unlogged:
+            return []
+
+        recovered = []
+        response = self.elastic_search.options(ignore_status=404).mget(index=generation.es_index_name, ids=unlogged)
+        for hit in response.get("docs", []):
+            if not hit.get("found"):
+                continue
+            body = dict(hit["_source"])
+            body["desc_1"] = body.pop("flavor_description", "")
+            document = self.review_to_document(body, body.pop("source", None) or hit["_id"])
+            self.review_log.record_upsert(document)
+            recovered.append(document)
+        self.logger.info(
+            f"Recovered {len(recovered)} of {len(unlogged)} unlogged reviews of generation {generation.number}."
+        )
+        return recovered
+
+    @staticmethod
+    def next_free_review_id(generation: IndexGeneration, num_rows: int) -> int:
+        """
+        Returns the next numeric suffix for new review source ids of a generation. Reviews
+        upserted in earlier runs are still in the record manager, so the suffix starts after
+        the largest stored id rather than after the dataset rows.
+
+        Args:
+            generation (IndexGeneration): The generation.
+            num_rows (int): Number of rows of the dataset.
+
+        Returns:
+            int: The next free suffix.
+        """
+        suffixes = [
+            int(group_id.removeprefix("review_"))
+            for group_id in generation.record_manager.list_group_ids()
+            if group_id.startswith("review_") and group_id.removeprefix("review_").isdigit()
+        ]
+        return max([num_rows, *(suffix + 1 for suffix in suffixes)])
+
+    def validate_review(self, review: dict):
+        """
+        Checks that a review has all fields needed to index it.
+
+        Args:
+            review (dict): The review fields, using the columns of the coffee dataset.
+
+        Raises:
+            ValueError: If a required field is missing or empty, or a numeric field is not a number.
+        """
+        if not isinstance(review, dict):
+            raise ValueError(f"A review must be a dict, got {type(review).__name__}.")
+        missing = [
+            field for field in self.required_review_fields
+            if not isinstance(review.get(field), str) or not review[field].strip()
+        ]
+        if missing:
+            raise ValueError(f"The review is missing the required fields {missing}.")
+        for field in self.numeric_review_fields:
+            if review.get(field) in (None, ""):
+                continue
+            try:
+                float(review[field])
+            except (TypeError, ValueError):
+                raise ValueError(f"The review field {field} must be a number, got {review[field]!r}.")
+
+    def build_shards(self, generation: IndexGeneration):
+        """
+        Partitions the catalog of a generation with its embeddings across local shard processes.
+        The embeddings are streamed to the shards in batches, mostly from the embedding store.
+
+        Args:
+            generation (IndexGeneration): The generation to build the shards for.
+        """
+        self.logger.info(f"Building local shards for generation {generation.number}...")
+        shards = ShardedIndex(generation.document, constants.num_shards)
+        shards.build(generation.chunks, self.vector_store_manager.embeddings.embed_documents_matrix)
+
+        previous, generation.shards = generation.shards, shards
+        if previous is not None:
+            previous.close()
+
+    def build_quantized_index(self, generation: IndexGeneration):
+        """
+        Quantizes the catalog embeddings of a generation into a local vector index.
+        The embeddings are streamed into the index in batches, mostly from the embedding store.
+
+        Args:
+            generation (IndexGeneration): The generation to build the index for.
+        """
+        self.logger.info(f"Building the {constants.quantization_mode} quantized index of generation {generation.number}...")
+        quantized = QuantizedVectorIndex(os.path.join(constants.quantized_index_dir, f"generation_{generation.number}.f32"))
+        quantized.build(generation.chunks, self.vector_store_manager.embeddings.embed_documents_matrix)
+
+        previous, generation.quantized = generation.quantized, quantized
+        if previous is not None and previous.path != quantized.path:
+            previous.close()
+
+    def build_neighbor_graph(self, generation: IndexGeneration):
+        """
+        Precomputes the "more like this" neighbors of every coffee of a generation.
+        With a quantized index, the graph reads the catalog embeddings from its memory map and
+        keeps its own copy memory-mapped next to it, so the embeddings never become resident.
+        Otherwise the graph is built from the embeddings that are already in the embedding store,
+        so it never calls, or even loads, the embedding model. Coffees without a stored embedding
+        are left out of the graph.
+
+        Args:
+            generation (IndexGeneration): The generation to build the graph for.
+        """
+        start = time.perf_counter()
+        sources = [doc.metadata["source"] for doc in generation.chunks]
+        path = None
+        if generation.quantized is not None and generation.quantized.floats is not None:
+            # right after the build, the slots of the quantized index are in catalog order
+            vectors = generation.quantized.floats
+            path = os.path.join(constants.quantized_index_dir, f"generation_{generation.number}_neighbors.f32")
+        else:
+            vectors, found = self.vector_store_manager.embeddings.store.get_matrix(
+                [doc.page_content for doc in generation.chunks]
+            )
+            if not found.all():
+                self.logger.info(f"{int((~found).sum())} coffees have no stored embedding and are not in the neighbor graph.")
+            sources = [source for source, stored in zip(sources, found) if stored]
+            vectors = vectors[found]
+            if not sources:
+                self.logger.info(f"No stored embeddings, generation {generation.number} has no neighbor graph.")
+                return
+        neighbors = NeighborGraph(constants.similar_k, path=path)
+        neighbors.build(sources, vectors)
+        previous, generation.neighbors = generation.neighbors, neighbors
+        if previous is not None and previous.path != neighbors.path:
+            previous.close()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.logger.info(f"Built the neighbor graph of generation {generation.number} in {elapsed_ms:.1f} ms.")
+
     def index_documents(self):
         """
         Loads coffee data, converts rows to Documents (embedding only the review),
-        and indexes them using the vector store and record manager.
+        and incrementally indexes them into the active generation.
         """
         try:
             self.logger.info("Starting the coffee review index process...")
-            df = self.data_loader.load_coffee_data()
-
-            documents = [
-                self.row_to_document(row, idx)
-                for idx, (_, row) in enumerate(df.iterrows())
-            ]
-
-            self.chunks = documents
-            self.add_chunk_to_index(documents)
-            self.add_to_elasticsearch(documents)  # NEW
+            with self._write_lock:
+                self.load_generation(self.active)
+                self.generation += 1
 
             self.logger.info("Indexing completed successfully.")
         except Exception as e:
@@ -183,6 +491,233 @@ class Index:
             self.logger.error(f"{e}")
             raise
 
+    def verify_generation(self, generation: IndexGeneration):
+        """
+        Checks that every catalog document, including the replayed and recovered single review
+        writes, reached ElasticSearch and the record manager.
+
+        Args:
+            generation (IndexGeneration): The generation to verify.
+
+        Raises:
+            RuntimeError: If an upserted review is missing from the catalog, or a backend does not
+                          hold the expected number of documents.
+        """
+        lost = [
+            source for source, document in self.review_log.changes().items()
+            if document is not None and source not in generation.chunk_positions
+        ]
+        if lost:
+            raise RuntimeError(f"Generation {generation.number} is missing the upserted reviews {lost[:10]}.")
+
+        expected = len(generation.chunks)
+        self.elastic_search.indices.refresh(index=generation.es_index_name)
+        es_count = self.elastic_search.count(index=generation.es_index_name)["count"]
+        record_count = len(generation.record_manager.list_keys())
+
+        if es_count != expected or record_count != expected:
+            raise RuntimeError(
+                f"Generation {generation.number} is incomplete: expected {expected} documents, "
+                f"ElasticSearch holds {es_count} and the record manager {record_count}."
+            )
+
+    def swap_alias(self, old: IndexGeneration, new: IndexGeneration):
+        """
+        Atomically points the ElasticSearch alias from the old to the new generation.
+
+        Args:
+            old (IndexGeneration): The generation currently behind the alias.
+            new (IndexGeneration): The generation to serve from now on.
+        """
+        if old.es_index_name == self.es_index_name:
+            # the legacy concrete index has to be removed in the same call that creates the alias
+            actions = [
+                {"add": {"index": new.es_index_name, "alias": self.es_index_name}},
+                {"remove_index": {"index": old.es_index_name}},
+            ]
+        else:
+            actions = [
+                {"remove": {"index": old.es_index_name, "alias": self.es_index_name}},
+                {"add": {"index": new.es_index_name, "alias": self.es_index_name}},
+            ]
+        self.elastic_search.indices.update_aliases(actions=actions)
+
+    def drop_generation(self, generation: IndexGeneration):
+        """
+        Deletes all data of a generation that no longer serves searches.
+
+        Args:
+            generation (IndexGeneration): The generation to garbage-collect.
+        """
+        try:
+            generation.vector_store.delete(delete_all=True)
+        except Exception as e:
+            # Pinecone rejects deleting a namespace that was never written to
+            self.logger.warning(f"Could not delete namespace of generation {generation.number}: {e}")
+
+        generation.record_manager.delete_keys(generation.record_manager.list_keys())
+        if generation.shards is not None:
+            generation.shards.close()
+        if generation.quantized is not None:
+            generation.quantized.close()
+        if generation.neighbors is not None:
+            generation.neighbors.close()
+        self.elastic_search.options(ignore_status=404).indices.delete(index=generation.es_index_name)
+        self.logger.info(f"Garbage-collected generation {generation.number}.")
+
+    def rebuild_index(self):
+        """
+        Rebuilds the whole index into a shadow generation while the active generation keeps
+        serving searches. Once the shadow generation is verified, searches are switched over
+        atomically and the old generation is garbage-collected after a grace period.
+        Single review writes wait until the rebuild has finished.
+        """
+        try:
+            with self._write_lock:
+                old = self.active
+                number = old.number + 1
+                self.logger.info(f"Building shadow generation {number}...")
+
+                if self.elastic_search.indices.exists(index=self.generation_names(number)[0]):
+                    self.logger.info(f"Removing leftovers of an aborted build of generation {number}.")
+                    self.drop_generation(self.create_generation(number))
+
+                shadow = self.create_generation(number)
+                shadow.prefix_index.add_queries(old.prefix_index.query_counts)
+                try:
+                    # the dataset alone lacks the upserted reviews, which the old generation still serves
+                    self.load_generation(shadow, previous=old)
+                    # never hand out ids again that were assigned in the old generation
+                    shadow.next_review_id = max(shadow.next_review_id, old.next_review_id)
+                    self.verify_generation(shadow)
+                except Exception:
+                    self.drop_generation(shadow)
+                    raise
+
+                self.swap_alias(old, shadow)
+                self.active = shadow
+                self.generation += 1
+
+            self.logger.info(f"Switched searches to generation {shadow.number}.")
+            gc_timer = threading.Timer(constants.index_gc_grace_seconds, self.drop_generation, args=(old,))
+            gc_timer.daemon = True
+            gc_timer.start()
+        except Exception as e:
+            self.logger.error(f"Error during the index rebuild: {e}")
+            raise
+
+    def upsert_review(self, review: dict, source: str | None = None) -> str:
+        """
+        Adds a new review or replaces an existing one without reprocessing the dataset.
+        The vector store, the ElasticSearch index and the in-memory chunks are updated
+        for this single review only, and the write is added to the review log, so the review
+        is kept across restarts and rebuilds.
+
+        Args:
+            review (dict): The review fields, using the columns of the coffee dataset.
+            source (str, optional): The source id of the review to replace.
+                                    A new id is assigned if omitted.
+
+        Returns:
+            str: The source id of the upserted review.
+
+        Raises:
+            ValueError: If the review is missing required fields.
+        """
+        self.validate_review(review)
+        try:
+            with self._write_lock:
+                generation = self.active
+                if source is None:
+                    source = f"review_{generation.next_review_id}"
+                    generation.next_review_id += 1
+
+                document = self.review_to_document(review, source)
+
+                # incremental cleanup replaces older versions of the same source
+                self.add_chunk_to_index([document], generation)
+                self.elastic_search.index(
+                    index=generation.es_index_name,
+                    id=source,
+                    document=self.document_to_es_body(document)
+                )
+                if any(local is not None for local in (generation.shards, generation.quantized, generation.neighbors)):
+                    vector = self.vector_store_manager.embeddings.embed_documents([document.page_content])[0]
+                    if generation.shards is not None:
+                        generation.shards.upsert(document, vector)
+                    if generation.quantized is not None:
+                        generation.quantized.upsert(document, vector)
+                    if generation.neighbors is not None:
+                        generation.neighbors.upsert(source, vector)
+
+                position = generation.chunk_positions.get(source)
+                if position is None:
+                    position = len(generation.chunks)
+                    generation.chunk_positions[source] = position
+                    generation.chunks.append(document)
+                else:
+                    generation.chunks[position] = document
+                generation.facets.set_document(position, document)
+                generation.signals.set_document(position, document)
+                generation.prefix_index.add_documents([document])
+                self.review_log.record_upsert(document)
+                self.generation += 1
+
+            self.logger.info(f"Upserted review {source} (generation {self.generation}).")
+            return source
+        except Exception as e:
+            self.logger.error(f"Failed to upsert review {source}: {e}")
+            raise
+
+    def delete_review(self, source: str) -> bool:
+        """
+        Deletes a single review from the vector store, the ElasticSearch index,
+        the record manager and the in-memory chunks. The delete is added to the review log,
+        so a deleted dataset row is not loaded again after a restart or rebuild.
+
+        Args:
+            source (str): The source id of the review to delete.
+
+        Returns:
+            bool: True if the review was known to the index, False otherwise.
+        """
+        try:
+            with self._write_lock:
+                generation = self.active
+                keys = generation.record_manager.list_keys(group_ids=[source])
+                if keys:
+                    generation.vector_store.delete(ids=keys)
+                    generation.record_manager.delete_keys(keys)
+                self.elastic_search.options(ignore_status=404).delete(
+                    index=generation.es_index_name, id=source
+                )
+                if generation.shards is not None:
+                    generation.shards.delete(source)
+                if generation.quantized is not None:
+                    generation.quantized.delete(source)
+                if generation.neighbors is not None:
+                    generation.neighbors.delete(source)
+
+                position = generation.chunk_positions.pop(source, None)
+                if position is not None:
+                    # swap with the last chunk to keep the removal O(1)
+                    last = generation.chunks.pop()
+                    if position < len(generation.chunks):
+                        generation.chunks[position] = last
+                        generation.chunk_positions[last.metadata["source"]] = position
+                        generation.facets.set_document(position, last)
+                        generation.signals.set_document(position, last)
+                    generation.facets.set_document(len(generation.chunks), None)
+                    generation.signals.set_document(len(generation.chunks), None)
+                self.review_log.record_delete(source)
+                self.generation += 1
+
+            self.logger.info(f"Deleted review {source} (generation {self.generation}).")
+            return bool(keys) or position is not None
+        except Exception as e:
+            self.logger.error(f"Failed to delete review {source}: {e}")
+            raise
+
 
 if __name__ == '__main__':
     my_index = Index()
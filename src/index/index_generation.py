@@ -0,0 +1,99 @@
+from typing import TYPE_CHECKING
+
+from langchain_core.documents import Document
+
+from src.facets.facet_engine import FacetEngine
+from src.index.record_store import RecordStore
+from src.rank.business_signals import BusinessSignals
+from src.retrieve.quantized_index import QuantizedVectorIndex
+from src.retrieve.sharded_index import ShardedIndex
+from src.similar.neighbor_graph import NeighborGraph
+from src.suggest.prefix_index import PrefixIndex
+
+if TYPE_CHECKING:
+    from langchain_pinecone import PineconeVectorStore
+
+
+class IndexGeneration:
+    """
+    A self-contained generation of the index. Searches always read from exactly one
+    generation, while a rebuild fills a new shadow generation next to it.
+
+    Attributes:
+        number (int): The generation number. Generation 0 is the legacy, un-versioned layout.
+        es_index_name (str): Name of the physical ElasticSearch index behind the alias.
+        namespace (str | None): Pinecone namespace holding the embeddings of this generation.
+        record_manager (RecordStore): Record manager tracking the embedded documents.
+        vector_store (PineconeVectorStore): Vector store bound to the namespace.
+        chunks (list[Document]): In-memory catalog of all review documents.
+        chunk_positions (dict[str, int]): Position of each source id in chunks.
+        next_review_id (int): Next free numeric suffix for new review source ids.
+        shards (ShardedIndex | None): Local sharded index, only used by the sharded retrieval backend.
+        quantized (QuantizedVectorIndex | None): Local quantized vector index, only used by the
+                                                 quantized retrieval backend.
+        prefix_index (PrefixIndex): Typeahead index over the catalog and past queries.
+        facets (FacetEngine): Facet bitmaps over the catalog positions.
+        signals (BusinessSignals): Rating, value and recency boosts over the catalog positions.
+        neighbors (NeighborGraph | None): Precomputed "more like this" neighbors of every coffee.
+    """
+
+    def __init__(
+            self,
+            number: int,
+            es_index_name: str,
+            namespace: str | None,
+            record_manager: RecordStore,
+            vector_store: "PineconeVectorStore",
+    ):
+        self.number = number
+        self.es_index_name = es_index_name
+        self.namespace = namespace
+        self.record_manager = record_manager
+        self.vector_store = vector_store
+        self.chunks: list[Document] = []
+        self.chunk_positions: dict[str, int] = {}
+        self.next_review_id = 0
+        self.shards: ShardedIndex | None = None
+        self.quantized: QuantizedVectorIndex | None = None
+        self.prefix_index = PrefixIndex()
+        self.facets = FacetEngine([])
+        self.signals = BusinessSignals([])
+        self.neighbors: NeighborGraph | None = None
+
+    def document(self, source: str) -> Document | None:
+        """
+        Looks up a review document of the catalog by its source id.
+
+        Args:
+            source (str): The source id.
+
+        Returns:
+            Document | None: The document, or None if it is not in the catalog.
+        """
+        position = self.chunk_positions.get(source)
+        if position is None or position >= len(self.chunks):
+            return None
+        document = self.chunks[position]
+        # a concurrent delete may have moved another document to this position
+        return document if document.metadata.get("source") == source else None
+
+    def set_catalog(self, documents: list[Document], next_review_id: int):
+        """
+        Replaces the in-memory catalog of this generation.
+
+        Args:
+            documents (list[Document]): The review documents.
+            next_review_id (int): Next free numeric suffix for new review source ids.
+        """
+        self.chunk_positions = {
+            doc.metadata["source"]: position for position, doc in enumerate(documents)
+        }
+        self.chunks = documents
+        self.next_review_id = next_review_id
+        self.facets = FacetEngine(documents)
+        self.signals = BusinessSignals(documents)
+
+        prefix_index = PrefixIndex()
+        prefix_index.add_documents(documents)
+        prefix_index.add_queries(self.prefix_index.query_counts)
+        self.prefix_index = prefix_index
@@ -0,0 +1,261 @@
+import json
+import os
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.constants import constants
+from src.logger.custom_logger import CustomLogger
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Sentence embeddings computed by an int8-quantized ONNX export of a Hugging Face model on CPU.
+
+    The first use exports the transformer to ONNX and applies dynamic int8 quantization to its
+    weights. Both models are cached below onnx_model_dir. Texts are embedded in length-sorted
+    batches that are only padded to their longest text. The maximum sequence length, the pooling
+    mode and the normalization are read from the sentence-transformers configuration of the model,
+    so the embeddings match the ones of the PyTorch model.
+
+    Attributes:
+        model_name (str): Name of the Hugging Face model.
+        model_dir (str): Directory of the exported and quantized models.
+        batch_size (int): Number of texts per inference call.
+        intra_op_threads (int): Threads ONNX Runtime uses within one operator.
+        max_length (int): Texts are truncated to this many tokens.
+        pooling (str): How token embeddings are pooled: "mean", "cls" or "max".
+        normalize (bool): Whether the pooled embeddings are L2-normalized.
+        tokenizer: The Hugging Face tokenizer of the model.
+        session (onnxruntime.InferenceSession): Session running the quantized model.
+    """
+
+    def __init__(
+            self,
+            model_name: str,
+            model_dir: str = constants.onnx_model_dir,
+            batch_size: int = constants.onnx_batch_size,
+            intra_op_threads: int = constants.onnx_intra_op_threads,
+    ):
+        self.log_dir = os.path.join(constants.root_dir, "logs")
+        self.logger = CustomLogger(self.log_dir, "logs.log").logger
+        self.model_name = model_name
+        self.model_dir = os.path.join(model_dir, model_name.replace("/", "__"))
+        self.batch_size = batch_size
+        self.intra_op_threads = intra_op_threads
+
+        try:
+            import onnxruntime
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise ImportError(
+                "The onnx embedding backend needs onnxruntime and transformers: pip install onnxruntime transformers"
+            ) from e
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.max_length, self.pooling, self.normalize = self.read_pooling_config()
+        quantized_path = os.path.join(self.model_dir, "model_int8.onnx")
+        if not os.path.exists(quantized_path):
+            self.export(quantized_path)
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            quantized_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.logger.info(
+            f"Loaded the int8 ONNX embedding model {quantized_path} with {intra_op_threads} threads "
+            f"({self.pooling} pooling, max_length {self.max_length}, normalize {self.normalize})."
+        )
+
+    def _read_json(self, filename: str) -> dict | list | None:
+        if os.path.isdir(self.model_name):
+            path = os.path.join(self.model_name, filename)
+        else:
+            from huggingface_hub import hf_hub_download
+
+            try:
+                path = hf_hub_download(self.model_name, filename)
+            except Exception:
+                return None
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def read_pooling_config(self) -> tuple[int, str, bool]:
+        """
+        Reads the maximum sequence length, the pooling mode and the normalization of the model
+        from its sentence-transformers configuration (sentence_bert_config.json, modules.json
+        and the config of its Pooling module). A model without this configuration falls back
+        to the tokenizer's maximum length, mean pooling and normalization.
+
+        Returns:
+            tuple[int, str, bool]: The maximum length, the pooling mode and whether to normalize.
+        """
+        max_length = min(self.tokenizer.model_max_length, 512)
+        pooling, normalize = "mean", True
+
+        sentence_bert_config = self._read_json("sentence_bert_config.json") or {}
+        max_length = sentence_bert_config.get("max_seq_length") or max_length
+
+        modules = self._read_json("modules.json")
+        if modules:
+            normalize = any(module.get("type", "").endswith(".Normalize") for module in modules)
+            pooling_module = next(
+                (module for module in modules if module.get("type", "").endswith(".Pooling")), None
+            )
+            pooling_config = self._read_json(f"{pooling_module['path']}/config.json") if pooling_module else None
+            if pooling_config:
+                if pooling_config.get("pooling_mode_cls_token"):
+                    pooling = "cls"
+                elif pooling_config.get("pooling_mode_max_tokens"):
+                    pooling = "max"
+                elif not pooling_config.get("pooling_mode_mean_tokens", True):
+                    raise ValueError(f"Unsupported pooling mode of {self.model_name}: {pooling_config}")
+        return int(max_length), pooling, normalize
+
+    def export(self, quantized_path: str):
+        """
+        Exports the transformer to ONNX with dynamic batch and sequence axes and
+        quantizes its weights to int8.
+
+        Args:
+            quantized_path (str): Where to write the quantized model.
+        """
+        import torch
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        from transformers import AutoModel
+
+        os.makedirs(self.model_dir, exist_ok=True)
+        float_path = os.path.join(self.model_dir, "model.onnx")
+        self.logger.info(f"Exporting {self.model_name} to ONNX at {float_path}...")
+
+        model = AutoModel.from_pretrained(self.model_name).eval()
+        sample = self.tokenizer(["an example sentence"], return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(sample[name] for name in input_names),
+                float_path,
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+            )
+
+        self.logger.info(f"Quantizing the weights of {float_path} to int8...")
+        quantize_dynamic(float_path, quantized_path, weight_type=QuantType.QInt8)
+
+    def _embed_batch(self, texts: list[str]) -> np.ndarray:
+        encoded = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_length, return_tensors="np"
+        )
+        inputs = {name: encoded[name].astype(np.int64) for name in self.input_names}
+        # InferenceSession.run is thread-safe, concurrent queries run in parallel
+        token_embeddings = self.session.run(None, inputs)[0]
+
+        mask = encoded["attention_mask"][..., None].astype(np.float32)
+        if self.pooling == "cls":
+            embeddings = token_embeddings[:, 0]
+        elif self.pooling == "max":
+            embeddings = np.where(mask > 0, token_embeddings, -np.inf).max(axis=1)
+        else:
+            embeddings = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if not self.normalize:
+            return embeddings
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.where(norms == 0, 1, norms)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """
+        Embeds texts in batches of similar length.
+
+        Args:
+            texts (list[str]): The texts to embed.
+
+        Returns:
+            list[list[float]]: One normalized embedding per text, in input order.
+        """
+        if not texts:
+            return []
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        embeddings = np.zeros((len(texts), 0), dtype=np.float32)
+        for start in range(0, len(texts), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            batch_embeddings = self._embed_batch([texts[i] for i in batch])
+            if embeddings.shape[1] == 0:
+                embeddings = np.zeros((len(texts), batch_embeddings.shape[1]), dtype=np.float32)
+            embeddings[batch] = batch_embeddings
+        return embeddings.tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed_batch([text])[0].tolist()
+
+
+def compare_embeddings(reference: Embeddings, candidate: Embeddings, texts: list[str]) -> dict[str, float]:
+    """
+    Compares two embedding models on the same texts: the cosine similarity between
+    their embeddings of each text, the latency of single queries and the documents per
+    second of batched embedding.
+
+    Args:
+        reference (Embeddings): The original model.
+        candidate (Embeddings): The model to check against it.
+        texts (list[str]): The texts to embed.
+
+    Returns:
+        dict[str, float]: Cosine agreement and timings of both models.
+    """
+    report = {}
+    embeddings = {}
+    for label, model in (("reference", reference), ("candidate", candidate)):
+        model.embed_query(texts[0])  # warm up
+
+        start = time.perf_counter()
+        for text in texts[:50]:
+            model.embed_query(text)
+        report[f"{label}_query_ms"] = (time.perf_counter() - start) * 1000 / min(len(texts), 50)
+
+        start = time.perf_counter()
+        embeddings[label] = np.asarray(model.embed_documents(texts), dtype=np.float32)
+        report[f"{label}_docs_per_second"] = len(texts) / (time.perf_counter() - start)
+
+    reference_embeddings, candidate_embeddings = (
+        matrix / np.linalg.norm(matrix, axis=1, keepdims=True) for matrix in embeddings.values()
+    )
+    cosines = (reference_embeddings * candidate_embeddings).sum(axis=1)
+    report["mean_cosine"] = float(cosines.mean())
+    report["min_cosine"] = float(cosines.min())
+    return report
+
+
+if __name__ == "__main__":
+    # Parity check and benchmark of the int8 ONNX model against the PyTorch model
+    import sys
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    from src.index.data_loader import DataLoader
+
+    min_cosine = 0.98
+    descriptions = DataLoader().load_coffee_data()["desc_1"].dropna().astype(str).tolist()[:500]
+    report = compare_embeddings(
+        HuggingFaceEmbeddings(model_name=constants.embedding_model_ml),
+        OnnxEmbeddings(constants.embedding_model_ml),
+        descriptions,
+    )
+    for key, value in report.items():
+        print(f"{key:<32} {value:10.3f}")
+    if report["min_cosine"] < min_cosine:
+        print(f"Parity check failed: minimum cosine {report['min_cosine']:.4f} < {min_cosine}")
+        sys.exit(1)
+    print("Parity check passed.")
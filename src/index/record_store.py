@@ -0,0 +1,300 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional, Sequence
+
+from langchain_core.indexing import RecordManager
+
+from src.constants import constants
+from src.logger.custom_logger import CustomLogger
+
+
+class RecordStore(RecordManager):
+    """
+    A SQLite record manager tuned for the bookkeeping done by LangChain's index() call.
+    It is a drop-in replacement for SQLRecordManager and uses the same table layout,
+    so existing record caches keep working.
+
+    The database runs in WAL mode, all writes are bulk executemany statements in one
+    transaction and the known keys of the namespace are loaded into memory once, so
+    existence checks never hit the database.
+
+    Attributes:
+        namespace (str): The namespace of the records.
+        db_path (str): Path of the SQLite database file.
+        batch_size (int): Maximum number of keys per IN clause when deleting.
+        known_keys (set[str]): All keys of the namespace currently stored in the database.
+    """
+
+    def __init__(self, namespace: str, db_path: str, batch_size: int = 500):
+        """
+        Initializes the RecordStore and opens the database connection.
+
+        Args:
+            namespace (str): The namespace of the records.
+            db_path (str): Path of the SQLite database file.
+            batch_size (int): Maximum number of keys per IN clause when deleting.
+        """
+        super().__init__(namespace=namespace)
+        self.log_dir = os.path.join(constants.root_dir, "logs")
+        self.logger = CustomLogger(self.log_dir, "logs.log").logger
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.known_keys: set[str] = set()
+        self._lock = threading.Lock()
+
+        self._connection = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("PRAGMA temp_store=MEMORY")
+
+    def create_schema(self) -> None:
+        """
+        Creates the record table if it does not exist and loads the known keys of the namespace.
+        """
+        with self._lock:
+            self._connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS upsertion_record (
+                    uuid VARCHAR NOT NULL PRIMARY KEY,
+                    "key" VARCHAR,
+                    namespace VARCHAR NOT NULL,
+                    group_id VARCHAR,
+                    updated_at FLOAT,
+                    CONSTRAINT uix_key_namespace UNIQUE ("key", namespace)
+                );
+                CREATE INDEX IF NOT EXISTS ix_upsertion_record_namespace ON upsertion_record (namespace);
+                CREATE INDEX IF NOT EXISTS ix_upsertion_record_group_id ON upsertion_record (group_id);
+                CREATE INDEX IF NOT EXISTS ix_upsertion_record_updated_at ON upsertion_record (updated_at);
+                """
+            )
+            rows = self._connection.execute(
+                'SELECT "key" FROM upsertion_record WHERE namespace = ?', (self.namespace,)
+            )
+            self.known_keys = {row[0] for row in rows}
+        self.logger.info(f"RecordStore loaded {len(self.known_keys)} keys for namespace: {self.namespace}")
+
+    async def acreate_schema(self) -> None:
+        self.create_schema()
+
+    def get_time(self) -> float:
+        return time.time()
+
+    async def aget_time(self) -> float:
+        return self.get_time()
+
+    def update(
+            self,
+            keys: Sequence[str],
+            *,
+            group_ids: Optional[Sequence[Optional[str]]] = None,
+            time_at_least: Optional[float] = None,
+    ) -> None:
+        """
+        Inserts or refreshes the records of the given keys in one bulk statement.
+
+        Args:
+            keys (Sequence[str]): The keys to upsert.
+            group_ids (Sequence[str | None], optional): The group id of each key.
+            time_at_least (float, optional): Lower bound for the update timestamp,
+                                             guards against clock drift.
+        """
+        if group_ids is None:
+            group_ids = [None] * len(keys)
+        if len(keys) != len(group_ids):
+            raise ValueError(
+                f"Number of keys ({len(keys)}) does not match number of group_ids ({len(group_ids)})"
+            )
+
+        update_time = self.get_time()
+        if time_at_least and update_time < time_at_least:
+            raise AssertionError(f"Time sync issue: {update_time} < {time_at_least}")
+
+        rows = [
+            (str(uuid.uuid4()), key, self.namespace, group_id, update_time)
+            for key, group_id in zip(keys, group_ids)
+        ]
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                self._connection.executemany(
+                    """
+                    INSERT INTO upsertion_record (uuid, "key", namespace, group_id, updated_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT ("key", namespace)
+                    DO UPDATE SET group_id = excluded.group_id, updated_at = excluded.updated_at
+                    """,
+                    rows,
+                )
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+            self.known_keys.update(keys)
+
+    async def aupdate(
+            self,
+            keys: Sequence[str],
+            *,
+            group_ids: Optional[Sequence[Optional[str]]] = None,
+            time_at_least: Optional[float] = None,
+    ) -> None:
+        self.update(keys, group_ids=group_ids, time_at_least=time_at_least)
+
+    def exists(self, keys: Sequence[str]) -> list[bool]:
+        """
+        Checks the given keys against the in-memory key set.
+
+        Args:
+            keys (Sequence[str]): The keys to check.
+
+        Returns:
+            list[bool]: Whether each key is stored.
+        """
+        return [key in self.known_keys for key in keys]
+
+    async def aexists(self, keys: Sequence[str]) -> list[bool]:
+        return self.exists(keys)
+
+    def list_keys(
+            self,
+            *,
+            before: Optional[float] = None,
+            after: Optional[float] = None,
+            group_ids: Optional[Sequence[str]] = None,
+            limit: Optional[int] = None,
+    ) -> list[str]:
+        """
+        Lists the keys of the namespace matching the given filters.
+
+        Args:
+            before (float, optional): Only keys updated before this timestamp.
+            after (float, optional): Only keys updated after this timestamp.
+            group_ids (Sequence[str], optional): Only keys of these groups.
+            limit (int, optional): Maximum number of keys to return.
+
+        Returns:
+            list[str]: The matching keys.
+        """
+        if not group_ids and group_ids is not None:
+            return []
+        if group_ids is None and before is None and after is None and limit is None:
+            with self._lock:
+                return list(self.known_keys)
+
+        query = 'SELECT "key" FROM upsertion_record WHERE namespace = ?'
+        params: list = [self.namespace]
+        if after is not None:
+            query += " AND updated_at > ?"
+            params.append(after)
+        if before is not None:
+            query += " AND updated_at < ?"
+            params.append(before)
+        if group_ids is not None:
+            query += f" AND group_id IN ({', '.join('?' * len(group_ids))})"
+            params.extend(group_ids)
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            return [row[0] for row in self._connection.execute(query, params)]
+
+    def list_group_ids(self) -> list[str]:
+        """
+        Lists the distinct group ids, i.e. the review source ids, of the namespace.
+
+        Returns:
+            list[str]: The group ids.
+        """
+        with self._lock:
+            return [
+                row[0] for row in self._connection.execute(
+                    "SELECT DISTINCT group_id FROM upsertion_record WHERE namespace = ? AND group_id IS NOT NULL",
+                    [self.namespace],
+                )
+            ]
+
+    async def alist_keys(
+            self,
+            *,
+            before: Optional[float] = None,
+            after: Optional[float] = None,
+            group_ids: Optional[Sequence[str]] = None,
+            limit: Optional[int] = None,
+    ) -> list[str]:
+        return self.list_keys(before=before, after=after, group_ids=group_ids, limit=limit)
+
+    def delete_keys(self, keys: Sequence[str]) -> None:
+        """
+        Deletes the records of the given keys with bulk IN deletes in one transaction.
+
+        Args:
+            keys (Sequence[str]): The keys to delete.
+        """
+        keys = list(keys)
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                for start in range(0, len(keys), self.batch_size):
+                    batch = keys[start:start + self.batch_size]
+                    self._connection.execute(
+                        f'DELETE FROM upsertion_record WHERE namespace = ? '
+                        f'AND "key" IN ({", ".join("?" * len(batch))})',
+                        [self.namespace, *batch],
+                    )
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+            self.known_keys.difference_update(keys)
+
+    async def adelete_keys(self, keys: Sequence[str]) -> None:
+        self.delete_keys(keys)
+
+
+if __name__ == "__main__":
+    # Compares the index() bookkeeping cost of SQLRecordManager and RecordStore
+    # for a full, a no-op and a small-delta run on the coffee dataset.
+    import tempfile
+
+    from langchain.indexes import SQLRecordManager, index
+    from langchain_core.documents import Document
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    from langchain_core.vectorstores import InMemoryVectorStore
+
+    from src.index.data_loader import DataLoader
+
+    df = DataLoader().load_coffee_data().fillna("")
+    documents = [
+        {"page_content": str(row["desc_1"]), "metadata": {"source": f"review_{idx}"}}
+        for idx, (_, row) in enumerate(df.iterrows())
+    ]
+
+    def run(record_manager, docs) -> tuple[float, dict]:
+        start = time.perf_counter()
+        result = index(
+            [Document(**doc) for doc in docs],
+            record_manager,
+            vector_store,
+            cleanup="incremental",
+            source_id_key="source",
+        )
+        return time.perf_counter() - start, result
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, manager in [
+            ("SQLRecordManager", SQLRecordManager("bench", db_url=f"sqlite:///{tmp_dir}/sql_record_manager.sql")),
+            ("RecordStore", RecordStore("bench", os.path.join(tmp_dir, "record_store.sql"))),
+        ]:
+            manager.create_schema()
+            vector_store = InMemoryVectorStore(DeterministicFakeEmbedding(size=8))
+            delta = [dict(doc) for doc in documents]
+            for doc in delta[:20]:
+                doc["page_content"] += " Updated."
+
+            for run_name, docs in [("full", documents), ("no-op", documents), ("small-delta", delta)]:
+                elapsed, result = run(manager, docs)
+                print(f"{name:>16} {run_name:>11}: {elapsed * 1000:8.1f} ms {result}")
@@ -0,0 +1,129 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from langchain_core.documents import Document
+
+from src.constants import constants
+from src.logger.custom_logger import CustomLogger
+
+
+class ReviewLog:
+    """
+    A persistent log of the single review writes made on top of the coffee dataset.
+
+    Every upsert stores the latest version of the review and every delete stores a tombstone,
+    keyed by the source id. The dataset alone does not contain these writes, so every
+    generation that is loaded from it, after a restart or by a rebuild, replays the log to
+    get back the catalog that was served before.
+
+    Attributes:
+        db_path (str): Path of the SQLite database file.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Opens the log and creates its table if it does not exist.
+
+        Args:
+            db_path (str): Path of the SQLite database file.
+        """
+        self.log_dir = os.path.join(constants.root_dir, "logs")
+        self.logger = CustomLogger(self.log_dir, "logs.log").logger
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._connection = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS review_delta (
+                source VARCHAR NOT NULL PRIMARY KEY,
+                document VARCHAR,
+                updated_at FLOAT
+            )
+            """
+        )
+
+    @staticmethod
+    def _encode(document: Document) -> str:
+        # metadata values read from pandas rows may be numpy scalars
+        return json.dumps(
+            {"page_content": document.page_content, "metadata": document.metadata},
+            default=lambda value: value.item() if hasattr(value, "item") else str(value),
+        )
+
+    def _write(self, source: str, document: str | None):
+        with self._lock:
+            self._connection.execute(
+                """
+                INSERT INTO review_delta (source, document, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT (source) DO UPDATE SET document = excluded.document, updated_at = excluded.updated_at
+                """,
+                (source, document, time.time()),
+            )
+
+    def record_upsert(self, document: Document):
+        """
+        Stores the latest version of an upserted review.
+
+        Args:
+            document (Document): The review document, with its source id in the metadata.
+        """
+        self._write(document.metadata["source"], self._encode(document))
+
+    def record_delete(self, source: str):
+        """
+        Stores a tombstone for a deleted review, so it is not loaded from the dataset again.
+
+        Args:
+            source (str): The source id of the deleted review.
+        """
+        self._write(source, None)
+
+    def changes(self) -> dict[str, Document | None]:
+        """
+        Returns all logged writes, in the order they were last made.
+
+        Returns:
+            dict[str, Document | None]: The latest version of each written review by source id,
+                                        None for deleted reviews.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT source, document FROM review_delta ORDER BY updated_at"
+            ).fetchall()
+        return {
+            source: None if document is None else Document(**json.loads(document))
+            for source, document in rows
+        }
+
+    def apply(self, documents: list[Document]) -> list[Document]:
+        """
+        Replays the log on the documents of the dataset: logged versions replace the dataset
+        rows with the same source id, deleted reviews are dropped and reviews that are not in
+        the dataset are appended.
+
+        Args:
+            documents (list[Document]): The documents of the dataset.
+
+        Returns:
+            list[Document]: The catalog with all logged writes applied.
+        """
+        changes = self.changes()
+        if not changes:
+            return documents
+        num_changes = len(changes)
+        catalog = []
+        for document in documents:
+            source = document.metadata["source"]
+            if source in changes:
+                document = changes.pop(source)
+            if document is not None:
+                catalog.append(document)
+        catalog.extend(document for document in changes.values() if document is not None)
+        self.logger.info(f"Replayed {num_changes} logged review writes onto {len(documents)} dataset rows.")
+        return catalog
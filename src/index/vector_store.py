@@ -1,12 +1,56 @@
 import os
+import threading
 import time
 from logging import Logger
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_pinecone import PineconeVectorStore
-from pinecone import Pinecone, ServerlessSpec
+from typing import TYPE_CHECKING
+
+from langchain_core.embeddings import Embeddings
 
 from src.logger.custom_logger import CustomLogger
 from src.constants import constants
+from src.index.embedding_store import CachedEmbeddings, EmbeddingStore
+
+if TYPE_CHECKING:
+    from langchain_pinecone import PineconeVectorStore
+    from pinecone import Pinecone
+
+
+class LazyEmbeddings(Embeddings):
+    """
+    Embeddings that import and load the Hugging Face model on the first embedding call,
+    so neither the model nor its dependencies (sentence-transformers, torch) are loaded
+    at startup unless something has to be embedded.
+
+    Attributes:
+        model_name (str): Name of the Hugging Face embedding model.
+        backend (str): "torch" runs the model with sentence-transformers,
+                       "onnx" runs an int8-quantized ONNX export of it.
+        model (HuggingFaceEmbeddings | OnnxEmbeddings | None): The loaded model, None until first use.
+    """
+
+    def __init__(self, model_name: str, backend: str = constants.embedding_backend):
+        self.model_name = model_name
+        self.backend = backend
+        self.model = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self.model is None:
+            with self._lock:
+                if self.model is None:
+                    if self.backend == "onnx":
+                        from src.index.onnx_embeddings import OnnxEmbeddings
+                        self.model = OnnxEmbeddings(self.model_name)
+                    else:
+                        from langchain_huggingface import HuggingFaceEmbeddings
+                        self.model = HuggingFaceEmbeddings(model_name=self.model_name)
+        return self.model
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.load().embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.load().embed_query(text)
 
 
 class VectorStore:
@@ -20,7 +64,11 @@ class VectorStore:
         pinecone_api_key (str): API key for authenticating with Pinecone.
         pc (Pinecone): Pinecone client instance for interacting with the Pinecone service.
         vector_store (PineconeVectorStore): The vector store instance created using Pinecone.
-        embedding_model (HuggingFaceEmbeddings): The embedding model used for embedding the document chunks.
+        embedding_model (str): Name of the embedding model used for embedding the document chunks.
+        embedding_backend (str): Runtime of the embedding model, "torch" or "onnx".
+        embeddings (CachedEmbeddings): The embedding model, loaded on first use and shared by all created vector stores.
+                                       Document embeddings are persisted in an EmbeddingStore and reused.
+        pinecone_index (Pinecone.Index): The Pinecone index, shared by all created vector stores.
     """
 
     def __init__(self):
@@ -34,8 +82,12 @@ class VectorStore:
         self.pinecone_api_key = constants.pinecone_api_key
         self.embedding_model = constants.embedding_model
         self.embedding_model_ml = constants.embedding_model_ml
+        self.embedding_backend = constants.embedding_backend
+        self.embeddings = None
+        self.pinecone_index = None
 
         try:
+            from pinecone import Pinecone
             self.pc = Pinecone(api_key=self.pinecone_api_key)
             self.logger.info("Pinecone client initialized successfully.")
         except Exception as e:
@@ -44,7 +96,7 @@ class VectorStore:
 
         self.vector_store = self.create_vectorstore()
 
-    def _initialize_index(self) -> Pinecone.Index:
+    def _initialize_index(self) -> "Pinecone.Index":
         """
         Initializes the Pinecone index if it does not already exist.
 
@@ -58,6 +110,7 @@ class VectorStore:
             existing_indexes = [index_info["name"] for index_info in self.pc.list_indexes()]
 
             if index_name not in existing_indexes:
+                from pinecone import ServerlessSpec
                 self.logger.info(f"Creating new index: {index_name}")
                 self.pc.create_index(
                     name=index_name,
@@ -79,19 +132,33 @@ class VectorStore:
             self.logger.error(f"Error initializing index: {e}")
             raise
 
-    def create_vectorstore(self) -> PineconeVectorStore:
+    def create_vectorstore(self, namespace: str | None = None) -> "PineconeVectorStore":
         """
         Creates and returns a PineconeVectorStore using Hugging Face embeddings.
+        The embedding model and the Pinecone index are shared by all vector stores
+        created by this instance.
+
+        Args:
+            namespace (str, optional): The Pinecone namespace to read from and write to.
+                                       Defaults to the default namespace.
 
         Returns:
             PineconeVectorStore: The vector store instance.
         """
-        self.logger.info("Creating vector store with Hugging Face embeddings...")
+        self.logger.info(f"Creating vector store with Hugging Face embeddings (namespace: {namespace})...")
 
         try:
-            embeddings = HuggingFaceEmbeddings(model_name=self.embedding_model_ml)
-            vs_index_name = self._initialize_index()
-            vector_store = PineconeVectorStore(index=vs_index_name, embedding=embeddings)
+            from langchain_pinecone import PineconeVectorStore
+            if self.embeddings is None:
+                self.embeddings = CachedEmbeddings(
+                    LazyEmbeddings(self.embedding_model_ml, self.embedding_backend),
+                    EmbeddingStore(f"{self.embedding_backend}:{self.embedding_model_ml}"),
+                )
+            if self.pinecone_index is None:
+                self.pinecone_index = self._initialize_index()
+            vector_store = PineconeVectorStore(
+                index=self.pinecone_index, embedding=self.embeddings, namespace=namespace
+            )
             self.logger.info("Vector store created successfully.")
             return vector_store
 
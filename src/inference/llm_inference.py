@@ -1,8 +1,5 @@
 import os
 
-import google.generativeai as genai
-from google.generativeai.types import GenerationConfig
-
 from src.constants import constants
 from src.logger.custom_logger import CustomLogger
 
@@ -25,8 +22,14 @@ class LLMInference:
         """
         self.log_dir = os.path.join(constants.root_dir, "logs")
         self.logger = CustomLogger(self.log_dir, "logs.log").logger
+        self.hot_path_logger = CustomLogger(
+            self.log_dir, "logs.log", name="inference", sample_rate=constants.log_sample_rate
+        ).logger
 
         try:
+            import google.generativeai as genai
+            from google.generativeai.types import GenerationConfig
+
             genai.configure(api_key=constants.gemini_api_key)
             self.model = genai.GenerativeModel(
                 model_name=model_name,
@@ -57,7 +60,7 @@ class LLMInference:
                  Returns an error message string if generation is blocked or fails.
         """
         try:
-            self.logger.info(f"Starting inference with user content: {str(user_content)[:200]}...")  # Log snippet
+            self.hot_path_logger.info(f"Starting inference with user content: {str(user_content)[:200]}...")  # Log snippet
 
             response = self.model.generate_content(
                 contents=user_content,
@@ -73,7 +76,7 @@ class LLMInference:
                 self.logger.warning("Inference returned no content or was possibly blocked without detailed feedback.")
                 return "Response could not be generated (possibly blocked or empty)."
 
-            self.logger.info("Inference completed successfully.")
+            self.hot_path_logger.info("Inference completed successfully.")
             return response.text
 
         except Exception as e:  # Catching broader exceptions from the API call
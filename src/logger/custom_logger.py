@@ -1,37 +1,126 @@
+import atexit
+import json
 import logging
 import os
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Callable
+
+from src.constants import constants
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    A formatter that renders each log record as a single JSON object per line.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        """
+        Formats the log record as a JSON string.
+
+        Args:
+            record (logging.LogRecord): The record to format.
+
+        Returns:
+            str: The JSON encoded log record.
+        """
+        payload = {
+            "time": self.formatTime(record),
+            "name": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class LazyArgument:
+    """
+    A log argument that is only computed when the record is formatted, so records that are
+    dropped by the level check or by sampling never pay for it.
+
+    Attributes:
+        function (Callable[[], object]): Computes the value to log.
+    """
+
+    def __init__(self, function: Callable[[], object]):
+        self.function = function
+
+    def __str__(self) -> str:
+        return str(self.function())
+
+
+class SamplingFilter(logging.Filter):
+    """
+    A filter that only lets a fraction of the records below WARNING pass.
+    Warnings and errors are never dropped.
+
+    Attributes:
+        sample_rate (float): Fraction of INFO/DEBUG records to keep, between 0 and 1.
+    """
+
+    def __init__(self, sample_rate: float):
+        super().__init__()
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.sample_rate >= 1.0:
+            return True
+        return random.random() < self.sample_rate
 
 
 class CustomLogger:
     """
     A class to set up and manage logging for the RAG system, with both console and file handlers.
 
+    Records are put on an in-memory queue by the calling thread and written to the console
+    and the rotating log file by a background listener thread, so logging never blocks a request.
+
     Attributes:
         log_dir (str): Directory where the log file will be stored.
         log_file (str): Name of the log file.
         logger (logging.Logger): Configured logger instance for logging information and errors.
     """
 
-    def __init__(self, log_dir: str = 'logs', log_file: str = 'logs.log'):
+    _listener: QueueListener | None = None
+
+    def __init__(
+            self,
+            log_dir: str = 'logs',
+            log_file: str = 'logs.log',
+            name: str | None = None,
+            sample_rate: float | None = None,
+    ):
         """
         Initializes the CustomLogger instance and sets up the logger.
 
         Args:
             log_dir (str): Directory where the log file will be stored.
             log_file (str): Name of the log file.
+            name (str, optional): Name of a child logger, e.g. for hot-path messages.
+                                  The child shares the handlers of the base logger.
+            sample_rate (float, optional): Fraction of INFO/DEBUG records of the child logger to keep.
         """
         self.log_dir = log_dir
         self.log_file = log_file
         self.logger = self._setup_logger()
-        self.logger.info("Custom Logger initialized successfully.")
+
+        if name:
+            self.logger = self._setup_child_logger(name, sample_rate)
+        else:
+            self.logger.debug("Custom Logger initialized successfully.")
 
     def _setup_logger(self) -> logging.Logger:
         """
-        Sets up a logger with console and file handlers.
+        Sets up a logger that enqueues records to a background thread which writes them
+        to the console and to a size-rotated log file.
         Automatically creates the log directory if it does not exist.
 
         Returns:
-            logging.Logger: The configured logger with console and file handlers.
+            logging.Logger: The configured logger with a queue handler.
         """
         logger = logging.getLogger(__name__)
 
@@ -47,21 +136,63 @@ class CustomLogger:
         console_handler = logging.StreamHandler()
         console_handler.setLevel(logging.INFO)
 
-        # Set up file handler (DEBUG level)
+        # Set up rotating file handler (DEBUG level)
         log_file_path = os.path.join(self.log_dir, self.log_file)
-        file_handler = logging.FileHandler(log_file_path)
+        file_handler = RotatingFileHandler(
+            log_file_path,
+            maxBytes=constants.log_max_bytes,
+            backupCount=constants.log_backup_count,
+            encoding="utf-8",
+        )
         file_handler.setLevel(logging.DEBUG)
 
         # Define a common formatter for both handlers
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        if constants.log_json:
+            formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
         console_handler.setFormatter(formatter)
         file_handler.setFormatter(formatter)
 
-        # Add handlers to the logger
-        logger.addHandler(console_handler)
-        logger.addHandler(file_handler)
+        # The request thread only enqueues, the listener thread does the I/O
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(QueueHandler(log_queue))
+        logger.propagate = False
+
+        CustomLogger._listener = QueueListener(
+            log_queue, console_handler, file_handler, respect_handler_level=True
+        )
+        CustomLogger._listener.start()
+        atexit.register(CustomLogger.shutdown)
 
         # Log after the logger is fully set up
         logger.info(f"logger setup completed with log file at {self.log_dir}/{self.log_file}.")
 
         return logger
+
+    def _setup_child_logger(self, name: str, sample_rate: float | None) -> logging.Logger:
+        """
+        Sets up a child logger which propagates to the base logger's queue handler.
+
+        Args:
+            name (str): Name of the child logger.
+            sample_rate (float, optional): Fraction of INFO/DEBUG records to keep.
+
+        Returns:
+            logging.Logger: The child logger.
+        """
+        child = self.logger.getChild(name)
+        if sample_rate is not None:
+            for existing in [f for f in child.filters if isinstance(f, SamplingFilter)]:
+                child.removeFilter(existing)
+            child.addFilter(SamplingFilter(sample_rate))
+        return child
+
+    @staticmethod
+    def shutdown():
+        """
+        Stops the background listener and flushes all pending records.
+        """
+        if CustomLogger._listener is not None:
+            CustomLogger._listener.stop()
+            CustomLogger._listener = None
@@ -0,0 +1,126 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+
+from src.constants import constants
+from src.logger.custom_logger import CustomLogger
+
+IMPORT_TIME_PATTERN = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+# src.ui.user_interface runs the Streamlit app when imported, so the UI is profiled
+# through the modules it imports
+DEFAULT_MODULES = [
+    "src.search_engine.search_engine",
+    "src.index.index",
+    "src.index.vector_store",
+    "src.translator.translator",
+    "src.inference.llm_inference",
+    "streamlit",
+]
+
+
+@dataclass
+class ImportTiming:
+    """
+    The import time of one module, as reported by python -X importtime.
+
+    Attributes:
+        name (str): The module name.
+        self_ms (float): Time spent importing the module itself.
+        cumulative_ms (float): Time including all imports it triggered.
+        depth (int): Nesting level, 0 for the module that was imported directly.
+    """
+    name: str
+    self_ms: float
+    cumulative_ms: float
+    depth: int
+
+
+def profile_import(module: str) -> list[ImportTiming]:
+    """
+    Imports a module in a fresh interpreter and returns the import time of every module it loaded.
+
+    Args:
+        module (str): The module to import.
+
+    Returns:
+        list[ImportTiming]: The import timings, in the order the imports finished.
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=constants.root_dir,
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{process.stderr.strip().splitlines()[-1]}")
+
+    timings = []
+    for line in process.stderr.splitlines():
+        match = IMPORT_TIME_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            timings.append(ImportTiming(name, int(self_us) / 1000, int(cumulative_us) / 1000, (len(indent) - 1) // 2))
+    return timings
+
+
+def startup_report(module: str, timings: list[ImportTiming], top: int = 10) -> tuple[float, str]:
+    """
+    Summarizes the import timings of a module by top-level package.
+
+    Args:
+        module (str): The module that was imported.
+        timings (list[ImportTiming]): Its import timings.
+        top (int): Number of packages to list.
+
+    Returns:
+        tuple[float, str]: The total import time in ms and the printable report.
+    """
+    total_ms = next((timing.cumulative_ms for timing in timings if timing.name == module and timing.depth == 0), 0.0)
+    by_package = defaultdict(float)
+    for timing in timings:
+        by_package[timing.name.split(".")[0]] += timing.self_ms
+
+    lines = [f"{module}: {total_ms:.0f} ms"]
+    for package, package_ms in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"    {package:<32} {package_ms:8.1f} ms")
+    return total_ms, "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Reports the cold import time of the search engine modules.")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="Modules to profile.")
+    parser.add_argument("--budget-ms", type=float, default=constants.startup_import_budget_ms,
+                        help="Maximum cold import time of each module.")
+    parser.add_argument("--top", type=int, default=10, help="Number of packages listed per module.")
+    args = parser.parse_args()
+
+    logger = CustomLogger(os.path.join(constants.root_dir, "logs"), "logs.log").logger
+    over_budget = []
+    for module in args.modules:
+        try:
+            total_ms, report = startup_report(module, profile_import(module), args.top)
+        except RuntimeError as e:
+            logger.error(str(e))
+            print(e)
+            # a module that cannot be imported cannot start at all
+            over_budget.append(module)
+            continue
+        print(report)
+        logger.info(f"Cold import time of {module}: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+        if total_ms > args.budget_ms:
+            over_budget.append(module)
+
+    if over_budget:
+        print(f"Over the startup budget of {args.budget_ms:.0f} ms or failed to import: {', '.join(over_budget)}")
+        return 1
+    print(f"All modules within the startup budget of {args.budget_ms:.0f} ms.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,6 +13,9 @@ class PromptBuilder:
         """
         self.log_dir = os.path.join(constants.root_dir, "logs")
         self.logger = CustomLogger(self.log_dir, "logs.log").logger
+        self.hot_path_logger = CustomLogger(
+            self.log_dir, "logs.log", name="prompt_builder", sample_rate=constants.log_sample_rate
+        ).logger
         self.system_prompt_text: str = self._load_system_prompt_text()
 
         self.logger.info("PromptBuilder initialized successfully with system prompt.")
@@ -87,5 +90,5 @@ class PromptBuilder:
             f"Relevant Coffee Information:\n---\n{coffee_description_str}\n---"
         ]
 
-        self.logger.info(f"Created user content parts with query and document context.")
+        self.hot_path_logger.info(f"Created user content parts with query and document context.")
         return user_content_parts
@@ -0,0 +1,120 @@
+import threading
+
+import numpy as np
+from langchain_core.documents import Document
+
+# weights of the retrieval score and of the rating, value and recency boosts per sort mode
+SORT_MODES = {
+    "relevance": None,
+    "top_rated": (1.0, 1.5, 0.0, 0.0),
+    "best_value": (1.0, 0.75, 1.0, 0.0),
+    "newest": (1.0, 0.0, 0.0, 1.5),
+}
+
+
+class BusinessSignals:
+    """
+    Keeps the rating, value and recency boosts of every catalog position of an index
+    generation in one float32 matrix, so a candidate set is rescored with a single
+    vectorized expression.
+
+    The boosts are read from the rating_score, log_price and review_year columns that the
+    DataLoader parses at ingestion, and are scaled to [0, 1] over the catalog: the best rated,
+    the cheapest and the most recently reviewed coffees get a boost of 1. Positions with a
+    missing value get a boost of 0.
+
+    Attributes:
+        size (int): Number of catalog positions.
+        boosts (np.ndarray): Matrix of rating, value and recency boosts, one row per position.
+        bounds (np.ndarray): Minimum and maximum of each raw signal over the catalog.
+    """
+
+    columns = ("rating_score", "log_price", "review_year")
+    rrf_constant = 60
+
+    def __init__(self, documents: list[Document]):
+        """
+        Computes the boosts of the catalog.
+
+        Args:
+            documents (list[Document]): The catalog, in position order.
+        """
+        self._lock = threading.Lock()
+        self.size = len(documents)
+        raw = np.array([self._raw(doc) for doc in documents], dtype=np.float32).reshape(-1, len(self.columns))
+        if np.isfinite(raw).any():
+            with np.errstate(all="ignore"):
+                self.bounds = np.stack([np.nanmin(raw, axis=0), np.nanmax(raw, axis=0)])
+        else:
+            self.bounds = np.zeros((2, len(self.columns)), dtype=np.float32)
+        self.bounds = np.nan_to_num(self.bounds)
+        self.boosts = self._scale(raw) if self.size else np.zeros((1, len(self.columns)), dtype=np.float32)
+
+    def _raw(self, doc: Document) -> list[float]:
+        values = []
+        for column in self.columns:
+            try:
+                values.append(float(doc.metadata.get(column)))
+            except (TypeError, ValueError):
+                values.append(np.nan)
+        return values
+
+    def _scale(self, raw: np.ndarray) -> np.ndarray:
+        low, high = self.bounds
+        scaled = np.clip((raw - low) / np.where(high > low, high - low, 1), 0, 1)
+        scaled[:, 1] = 1 - scaled[:, 1]  # cheaper is better
+        return np.nan_to_num(scaled, nan=0.0).astype(np.float32)
+
+    def set_document(self, position: int, doc: Document | None):
+        """
+        Sets or clears the boosts of one catalog position, scaled with the bounds of the catalog.
+        Appending at position == size grows the catalog, clearing the last position shrinks it.
+
+        Args:
+            position (int): The catalog position.
+            doc (Document | None): The document now at this position, None to clear it.
+        """
+        with self._lock:
+            if position >= len(self.boosts):
+                grown = np.zeros((max(position + 1, 2 * len(self.boosts), 64), len(self.columns)), dtype=np.float32)
+                grown[:len(self.boosts)] = self.boosts
+                self.boosts = grown
+            if doc is None:
+                self.boosts[position] = 0
+                if position == self.size - 1:
+                    self.size -= 1
+            else:
+                self.boosts[position] = self._scale(np.array([self._raw(doc)], dtype=np.float32))[0]
+                self.size = max(self.size, position + 1)
+
+    def rank(self, ranking: list[Document], positions: list[int], sort: str) -> list[Document]:
+        """
+        Reorders a fused ranking by its retrieval score plus the weighted boosts of a sort mode.
+        The retrieval score is the reciprocal rank of each candidate in the fused ranking.
+
+        Args:
+            ranking (list[Document]): The fused ranking, best first.
+            positions (list[int]): Catalog position of each document, -1 if it is not in the catalog.
+            sort (str): One of SORT_MODES.
+
+        Returns:
+            list[Document]: The reordered ranking.
+
+        Raises:
+            ValueError: If the sort mode is unknown.
+        """
+        if sort not in SORT_MODES:
+            raise ValueError(f"Unknown sort mode: {sort}")
+        weights = SORT_MODES[sort]
+        if weights is None or len(ranking) <= 1:
+            return ranking
+
+        positions = np.asarray(positions, dtype=np.int64)
+        retrieval_weight, boost_weights = weights[0], np.asarray(weights[1:], dtype=np.float32)
+        with self._lock:
+            known = (positions >= 0) & (positions < self.size)
+            scores = (
+                retrieval_weight * self.rrf_constant / (self.rrf_constant + np.arange(len(ranking), dtype=np.float32))
+                + np.where(known, self.boosts[np.where(known, positions, 0)] @ boost_weights, 0)
+            )
+        return [ranking[i] for i in np.argsort(-scores, kind="stable")]
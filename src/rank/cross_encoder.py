@@ -0,0 +1,235 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.documents import Document
+
+from src.constants import constants
+from src.logger.custom_logger import CustomLogger
+
+
+class CrossEncoderReranker:
+    """
+    Reorders the top of a fused ranking with a small cross-encoder that reads the query and
+    the flavor description of each candidate together, on CPU and without a network hop.
+
+    All (query, description) pairs that are not cached are scored in one padded batch.
+    Scores are cached by query and review, so repeated and paginated queries only pay for new
+    candidates. The cost per pair is tracked as a moving average, and a rerank whose predicted
+    cost exceeds the latency budget is skipped, leaving the fused order unchanged.
+
+    Searches never wait for the model: it is loaded in a background thread on first use, and a
+    rerank that needs the model while it is loading or scoring for another search is skipped.
+    Fully cached reranks do not touch the model. If torch or transformers are not installed,
+    or the model cannot be loaded, reranking is disabled instead of failing searches.
+
+    Attributes:
+        model_name (str): Name of the Hugging Face cross-encoder.
+        top_n (int): Number of candidates to rerank, 0 disables reranking.
+        budget_ms (float): Maximum predicted scoring time of one rerank.
+        cache_size (int): Maximum number of cached pair scores.
+        ms_per_pair (float | None): Moving average of the scoring time per pair, None before the first batch.
+        reranked (int): Number of reranked rankings.
+        skipped (int): Number of rankings left unchanged because of the latency budget
+                       or because the model was loading or busy.
+        cache_hits (int): Number of pair scores served from the cache.
+    """
+
+    def __init__(
+            self,
+            model_name: str = constants.reranker_model,
+            top_n: int = constants.rerank_top_n,
+            budget_ms: float = constants.rerank_budget_ms,
+            cache_size: int = constants.rerank_cache_size,
+            max_length: int = 256,
+    ):
+        self.log_dir = os.path.join(constants.root_dir, "logs")
+        self.logger = CustomLogger(self.log_dir, "logs.log").logger
+        self.model_name = model_name
+        self.top_n = top_n
+        self.budget_ms = budget_ms
+        self.cache_size = cache_size
+        self.max_length = max_length
+        self.ms_per_pair: float | None = None
+        self.reranked = 0
+        self.skipped = 0
+        self.cache_hits = 0
+        self._scores: OrderedDict[tuple[str, str, str], float] = OrderedDict()
+        self._tokenizer = None
+        self._model = None
+        self._loader: threading.Thread | None = None
+        # _lock guards the score cache and the statistics, _model_lock the model
+        self._lock = threading.Lock()
+        self._model_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.top_n > 0
+
+    def load(self):
+        """
+        Loads the tokenizer and the model, once. Blocks while the model is loading or scoring.
+        """
+        with self._model_lock:
+            if self._model is None:
+                import torch  # noqa: F401
+                from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+                self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                self._model = AutoModelForSequenceClassification.from_pretrained(self.model_name).eval()
+                self.logger.info(f"Loaded the cross-encoder {self.model_name}.")
+
+    def _load_in_background(self):
+        try:
+            self.load()
+        except ImportError as e:
+            self.top_n = 0
+            self.logger.warning(f"Disabled cross-encoder reranking, torch and transformers are required: {e}")
+        except Exception as e:
+            self.top_n = 0
+            self.logger.error(f"Disabled cross-encoder reranking, could not load {self.model_name}: {e}")
+
+    def _score(self, query: str, texts: list[str]) -> np.ndarray:
+        # the caller holds _model_lock and the model is loaded
+        import torch
+
+        start = time.perf_counter()
+        encoded = self._tokenizer(
+            [query] * len(texts), texts,
+            padding=True, truncation=True, max_length=self.max_length, return_tensors="pt"
+        )
+        with torch.inference_mode():
+            logits = self._model(**encoded).logits
+        with self._lock:
+            self._record_latency((time.perf_counter() - start) * 1000 / len(texts))
+        # single-logit models output the relevance directly, otherwise the last class is "relevant"
+        return logits.reshape(len(texts), -1)[:, -1].float().numpy()
+
+    def score(self, query: str, texts: list[str]) -> np.ndarray:
+        """
+        Scores (query, text) pairs with one padded forward pass of the cross-encoder
+        and updates the moving average of the time per pair. Loads the model if needed
+        and waits for other scoring calls.
+
+        Args:
+            query (str): The query.
+            texts (list[str]): The texts to score against the query.
+
+        Returns:
+            np.ndarray: One relevance score per text, higher is better.
+        """
+        self.load()
+        with self._model_lock:
+            return self._score(query, texts)
+
+    def rerank(self, query: str, ranking: list[Document]) -> list[Document]:
+        """
+        Reorders the top_n documents of a ranking by their cross-encoder scores.
+        The remaining documents keep their order behind them.
+
+        Args:
+            query (str): The query, in the language of the descriptions.
+            ranking (list[Document]): The fused ranking, best first.
+
+        Returns:
+            list[Document]: The reranked ranking, or the unchanged ranking if reranking is
+                            disabled, would exceed the latency budget or would have to
+                            wait for the model.
+        """
+        if not self.enabled or len(ranking) <= 1:
+            return ranking
+        head = ranking[:self.top_n]
+        keys = [(query, doc.metadata.get("source", ""), doc.page_content) for doc in head]
+
+        scores = np.empty(len(head), dtype=np.float32)
+        missing = []
+        with self._lock:
+            for position, key in enumerate(keys):
+                cached = self._scores.get(key)
+                if cached is None:
+                    missing.append(position)
+                else:
+                    self._scores.move_to_end(key)
+                    scores[position] = cached
+            self.cache_hits += len(head) - len(missing)
+
+        if missing:
+            if self._model is None:
+                with self._lock:
+                    if self._loader is None:
+                        self._loader = threading.Thread(
+                            target=self._load_in_background, name="cross-encoder-loader", daemon=True
+                        )
+                        self._loader.start()
+                    self.skipped += 1
+                self.logger.info("Skipped reranking: the cross-encoder is loading.")
+                return ranking
+
+            with self._lock:
+                predicted_ms = None if self.ms_per_pair is None else self.ms_per_pair * len(missing)
+                over_budget = predicted_ms is not None and predicted_ms > self.budget_ms
+                if over_budget:
+                    self.skipped += 1
+                    # let the estimate decay, so a transient slowdown does not disable reranking for good
+                    self.ms_per_pair *= 0.9
+            if over_budget:
+                self.logger.warning(
+                    f"Skipped reranking: {len(missing)} pairs would take about "
+                    f"{predicted_ms:.0f} ms, budget {self.budget_ms:.0f} ms."
+                )
+                return ranking
+
+            # skip instead of queueing behind another search, the wait would not count against the budget
+            if not self._model_lock.acquire(blocking=False):
+                with self._lock:
+                    self.skipped += 1
+                self.logger.info("Skipped reranking: the cross-encoder is busy with another search.")
+                return ranking
+            try:
+                scores[missing] = self._score(query, [head[position].page_content for position in missing])
+            finally:
+                self._model_lock.release()
+            with self._lock:
+                for position in missing:
+                    self._scores[keys[position]] = float(scores[position])
+                while len(self._scores) > self.cache_size:
+                    self._scores.popitem(last=False)
+
+        with self._lock:
+            self.reranked += 1
+        return [head[i] for i in np.argsort(-scores, kind="stable")] + ranking[len(head):]
+
+    def _record_latency(self, ms_per_pair: float):
+        if self.ms_per_pair is None:
+            self.ms_per_pair = ms_per_pair
+        else:
+            self.ms_per_pair = 0.8 * self.ms_per_pair + 0.2 * ms_per_pair
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "reranked": self.reranked,
+            "skipped": self.skipped,
+            "cache_hits": self.cache_hits,
+            "ms_per_pair": self.ms_per_pair or 0.0,
+        }
+
+
+if __name__ == "__main__":
+    # Latency of reranking the top 20 candidates, without and with cached scores
+    from src.index.data_loader import DataLoader
+
+    descriptions = DataLoader().load_coffee_data()["desc_1"].dropna().astype(str).tolist()[:20]
+    candidates = [
+        Document(page_content=text, metadata={"source": f"review_{i}"}) for i, text in enumerate(descriptions)
+    ]
+    reranker = CrossEncoderReranker(top_n=20, budget_ms=float("inf"))
+    reranker.score("warm up", descriptions[:2])
+
+    for label in ("uncached", "cached"):
+        start = time.perf_counter()
+        reranked = reranker.rerank("bright fruity coffee with berry notes", candidates)
+        print(f"{label:<8} rerank of 20: {(time.perf_counter() - start) * 1000:7.1f} ms")
+    for doc in reranked[:3]:
+        print(doc.metadata["source"], doc.page_content[:80])
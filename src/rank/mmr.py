@@ -0,0 +1,82 @@
+import numpy as np
+
+
+def rank_relevance(num_candidates: int, constant: int = 60) -> np.ndarray:
+    """
+    Relevance of the candidates of a ranking by their position, as in reciprocal rank fusion:
+    1 for the first candidate, decaying with the rank.
+    """
+    return constant / (constant + np.arange(num_candidates, dtype=np.float32))
+
+
+def maximal_marginal_relevance(
+        relevance: list[float] | np.ndarray,
+        candidate_vectors: list[list[float]] | np.ndarray,
+        k: int,
+        lambda_mult: float = 0.7,
+) -> list[int]:
+    """
+    Selects k diverse and relevant candidates with Maximal Marginal Relevance.
+
+    The relevance of each candidate is given by the caller, e.g. its rank_relevance in the fused
+    and reranked ranking, so MMR only trades that order off against diversity instead of
+    replacing it with the query similarity.
+
+    The similarity of every candidate to its closest selected candidate is kept in one array
+    and updated with an element-wise maximum after each pick, so each step is a few
+    vectorized operations over all candidates. Only the rows of the candidate-by-candidate
+    similarity matrix that belong to selected candidates are ever needed, so they are
+    computed as candidates are picked instead of multiplying out the full matrix.
+
+    Args:
+        relevance (list[float] | np.ndarray): The relevance of each candidate, roughly in [0, 1].
+        candidate_vectors (list[list[float]] | np.ndarray): The candidate embeddings, one row each.
+        k (int): Number of candidates to select.
+        lambda_mult (float): Trade-off between relevance (1.0) and diversity (0.0).
+
+    Returns:
+        list[int]: Indices of the selected candidates, in selection order.
+    """
+    candidates = np.asarray(candidate_vectors, dtype=np.float32)
+    k = min(k, len(candidates))
+    if k == 0:
+        return []
+    candidates = candidates / np.maximum(np.sqrt(np.einsum("ij,ij->i", candidates, candidates)), 1e-12)[:, None]
+
+    relevance = lambda_mult * np.asarray(relevance, dtype=np.float32)[:len(candidates)]
+    selected = [int(np.argmax(relevance))]
+    closest = candidates @ candidates[selected[0]]
+    scores = np.empty_like(relevance)
+    for _ in range(k - 1):
+        np.multiply(closest, lambda_mult - 1, out=scores)
+        scores += relevance
+        scores[selected] = -np.inf
+        pick = int(np.argmax(scores))
+        selected.append(pick)
+        np.maximum(closest, candidates @ candidates[pick], out=closest)
+    return selected
+
+
+def diversify(ranking: list, selected: list[int]) -> list:
+    """
+    Moves the selected entries of a ranking to the front, in selection order,
+    followed by the remaining entries in their original order.
+    """
+    chosen = set(selected)
+    return [ranking[i] for i in selected] + [entry for i, entry in enumerate(ranking) if i not in chosen]
+
+
+if __name__ == "__main__":
+    # Benchmark: top 10 of 200 candidates
+    import time
+
+    rng = np.random.default_rng(0)
+    candidate_vectors = rng.normal(size=(200, 768)).astype(np.float32)
+    relevance = rank_relevance(len(candidate_vectors))
+    maximal_marginal_relevance(relevance, candidate_vectors, 10)
+
+    runs = 1000
+    start = time.perf_counter()
+    for _ in range(runs):
+        maximal_marginal_relevance(relevance, candidate_vectors, 10)
+    print(f"MMR top 10 of 200: {(time.perf_counter() - start) * 1e6 / runs:.0f} us")
@@ -1,23 +1,106 @@
-from elasticsearch import Elasticsearch
+from typing import TYPE_CHECKING
+
+from src.index import es_analysis
+
+if TYPE_CHECKING:
+    from elasticsearch import Elasticsearch
 
 
 class ElasticBM25Retriever:
-    def __init__(self, es_client: Elasticsearch, index_name: str):
+    def __init__(self, es_client: "Elasticsearch", index_name: str):
         self.client = es_client
         self.index = index_name
 
+    @staticmethod
+    def build_query(query: str) -> dict:
+        """
+        Builds a weighted multi_match over the stemmed description fields and the trigram and
+        edge-n-gram subfields. Typos and partial terms are matched through the n-grams
+        built at index time, so no fuzzy expansion is needed at search time.
+        """
+        return {
+            "multi_match": {
+                "query": query,
+                "type": "most_fields",
+                "fields": es_analysis.SEARCH_FIELDS,
+            }
+        }
+
+    @staticmethod
+    def build_fuzzy_query(query: str) -> dict:
+        """
+        Builds the previous query: a fuzzy match on the flavor description only.
+        """
+        return {
+            "match": {
+                "flavor_description": {
+                    "query": query,
+                    "fuzziness": "AUTO"
+                }
+            }
+        }
+
     def invoke(self, query: str, k: int = 10):
         response = self.client.search(
             index=self.index,
-            query={
-                "match": {
-                    "flavor_description": {
-                        "query": query,
-                        "fuzziness": "AUTO"
-                    }
-                }
-            },
+            query=self.build_query(query),
             size=k
         )
 
         return [hit["_source"] for hit in response["hits"]["hits"]]
+
+    def invoke_many(self, queries: list[str], k: int = 10, batch_size: int = 100) -> list[list[dict]]:
+        """
+        Runs many queries with one _msearch request per batch.
+
+        Args:
+            queries (list[str]): The queries.
+            k (int): Number of hits per query.
+            batch_size (int): Number of queries per _msearch request.
+
+        Returns:
+            list[list[dict]]: The hit sources of each query.
+        """
+        results = []
+        for start in range(0, len(queries), batch_size):
+            searches = []
+            for query in queries[start:start + batch_size]:
+                searches.append({"index": self.index})
+                searches.append({"query": self.build_query(query), "size": k})
+            response = self.client.msearch(searches=searches)
+            for item in response["responses"]:
+                if "error" in item:
+                    raise RuntimeError(f"ElasticSearch _msearch query failed: {item['error']}")
+                results.append([hit["_source"] for hit in item["hits"]["hits"]])
+        return results
+
+
+if __name__ == "__main__":
+    # Latency comparison of the n-gram multi_match and the fuzzy match
+    import time
+
+    from elasticsearch import Elasticsearch
+
+    from src.constants import constants
+
+    client = Elasticsearch(constants.es_url, api_key=constants.es_api_key)
+    queries = [
+        "chocolate", "choclate", "dark chocolate and cherry", "bright citrus acidity", "citrsy",
+        "floral jasmine", "jasmin", "caramel sweetness", "carmel", "nutty almond finish",
+        "berry jam", "blueberry", "smoky earthy", "juicy stone fruit", "honey and vanilla",
+    ]
+    for label, build in (("fuzzy match", ElasticBM25Retriever.build_fuzzy_query),
+                         ("n-gram multi_match", ElasticBM25Retriever.build_query)):
+        took, wall = [], []
+        for _ in range(5):
+            for query in queries:
+                start = time.perf_counter()
+                response = client.search(index=constants.es_index_name, query=build(query), size=200)
+                wall.append((time.perf_counter() - start) * 1000)
+                took.append(response["took"])
+        took.sort()
+        wall.sort()
+        print(
+            f"{label:<20} server p50 {took[len(took) // 2]} ms, p95 {took[int(len(took) * 0.95)]} ms, "
+            f"client p50 {wall[len(wall) // 2]:.1f} ms, p95 {wall[int(len(wall) * 0.95)]:.1f} ms"
+        )
@@ -0,0 +1,318 @@
+import os
+import threading
+from typing import Callable
+
+import numpy as np
+from langchain_core.documents import Document
+
+from src.constants import constants
+from src.facets.facet_engine import popcount
+from src.logger.custom_logger import CustomLogger
+
+
+class QuantizedVectorIndex:
+    """
+    A local vector index that keeps only compact codes of the embeddings in memory.
+
+    In "binary" mode every embedding is reduced to the signs of its mean-centered components,
+    1 bit per dimension, and candidates are found by Hamming distance with XOR and popcount.
+    In "int8" mode every embedding is scaled to int8 with one float scale per vector, and
+    candidates are found by approximate dot products. In both modes the best candidates are
+    rescored with the normalized float32 embeddings, which are memory-mapped from disk.
+
+    Attributes:
+        path (str): File of the float32 embeddings, one row per slot.
+        mode (str): "binary" or "int8".
+        rescore (int): Number of candidates rescored with the float embeddings.
+        documents (dict[str, Document]): The indexed documents by source id.
+        slots (dict[str, int]): Slot of each live source id.
+        size (int): Number of used slots, including deleted ones.
+    """
+
+    block_size = 16384
+
+    def __init__(
+            self,
+            path: str,
+            mode: str = constants.quantization_mode,
+            rescore: int = constants.quantization_rescore,
+    ):
+        if mode not in ("binary", "int8"):
+            raise ValueError(f"Unknown quantization mode: {mode}")
+        self.log_dir = os.path.join(constants.root_dir, "logs")
+        self.logger = CustomLogger(self.log_dir, "logs.log").logger
+        self.path = path
+        self.mode = mode
+        self.rescore = rescore
+        self.documents: dict[str, Document] = {}
+        self.slots: dict[str, int] = {}
+        self.sources: list[str | None] = []
+        self.size = 0
+        self.dimension = 0
+        self.mean = np.zeros(0, dtype=np.float32)
+        self.codes = np.zeros((0, 0), dtype=np.uint64 if mode == "binary" else np.int8)
+        self.scales = np.zeros(0, dtype=np.float32)
+        self.alive = np.zeros(0, dtype=bool)
+        self._floats: np.ndarray | None = None
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def _encode(self, vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the codes and the scales of normalized vectors.
+        """
+        if self.mode == "binary":
+            bits = vectors - self.mean > 0
+            padded = np.zeros((len(vectors), -(-self.dimension // 64) * 64), dtype=bool)
+            padded[:, :self.dimension] = bits
+            return np.packbits(padded, axis=1, bitorder="little").view("<u8"), np.ones(len(vectors), dtype=np.float32)
+        scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127
+        return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+    def _ensure_capacity(self, rows: int, code_shape: tuple[int, ...]):
+        capacity = len(self.alive)
+        if self.size + rows <= capacity:
+            return
+        new_capacity = max(self.size + rows, capacity * 2, 16)
+        codes = np.zeros((new_capacity, code_shape[1]), dtype=self.codes.dtype)
+        if self.size:
+            codes[:self.size] = self.codes[:self.size]
+        self.codes = codes
+        self.scales = np.concatenate([self.scales[:self.size], np.zeros(new_capacity - self.size, dtype=np.float32)])
+        self.alive = np.concatenate([self.alive[:self.size], np.zeros(new_capacity - self.size, dtype=bool)])
+
+    def _add_slots(self, documents: list[Document], codes: np.ndarray, scales: np.ndarray):
+        self._ensure_capacity(len(documents), codes.shape)
+        for document, code, scale in zip(documents, codes, scales):
+            source = document.metadata["source"]
+            if source in self.slots:
+                self.alive[self.slots[source]] = False
+            slot = self.size
+            self.size += 1
+            self.codes[slot] = code
+            self.scales[slot] = scale
+            self.alive[slot] = True
+            self.slots[source] = slot
+            self.sources.append(source)
+            self.documents[source] = document
+
+    def _map(self):
+        self._floats = np.memmap(self.path, dtype=np.float32, mode="r", shape=(self.size, self.dimension))
+
+    def _append(self, documents: list[Document], vectors: np.ndarray):
+        codes, scales = self._encode(vectors)
+        with open(self.path, "ab") as f:
+            f.truncate(self.size * 4 * self.dimension)
+            f.write(vectors.tobytes())
+        self._add_slots(documents, codes, scales)
+        self._map()
+
+    def build(
+            self,
+            documents: list[Document],
+            embed: Callable[[list[str]], np.ndarray],
+            batch_size: int = 2048,
+    ):
+        """
+        Quantizes the embeddings of the documents and writes the float embeddings to disk.
+
+        The embeddings are streamed in batches: the first pass writes the normalized float
+        embeddings to disk and sums them up for the binary-mode mean, the second pass encodes
+        them from the memory map. Only one batch of float embeddings is ever held in memory.
+
+        Args:
+            documents (list[Document]): The review documents.
+            embed (Callable[[list[str]], np.ndarray]): Embeds a batch of page contents,
+                                                       one row per text.
+            batch_size (int): Number of documents embedded and encoded at once.
+        """
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            total = None
+            with open(self.path, "wb") as f:
+                for start in range(0, len(documents), batch_size):
+                    batch = documents[start:start + batch_size]
+                    vectors = self._normalize(embed([document.page_content for document in batch]))
+                    if total is None:
+                        self.dimension = vectors.shape[1]
+                        total = np.zeros(self.dimension, dtype=np.float64)
+                    total += vectors.sum(axis=0)
+                    f.write(vectors.tobytes())
+            if total is None:
+                return
+            if self.mode == "binary":
+                self.mean = (total / len(documents)).astype(np.float32)
+            else:
+                self.mean = np.zeros(self.dimension, dtype=np.float32)
+
+            floats = np.memmap(self.path, dtype=np.float32, mode="r", shape=(len(documents), self.dimension))
+            for start in range(0, len(documents), batch_size):
+                codes, scales = self._encode(np.asarray(floats[start:start + batch_size]))
+                self._add_slots(documents[start:start + batch_size], codes, scales)
+            self._map()
+        self.logger.info(
+            f"Built a {self.mode} quantized index with {len(documents)} documents "
+            f"({self.memory_bytes() / 1024:.0f} KB of codes in memory)."
+        )
+
+    @property
+    def floats(self) -> np.ndarray | None:
+        """
+        The memory-mapped, normalized float32 embeddings, one row per slot. Right after a build,
+        the slots are in the order of the built documents.
+        """
+        return self._floats
+
+    def upsert(self, document: Document, vector: list[float]):
+        with self._lock:
+            self._append([document], self._normalize(np.asarray([vector])))
+
+    def delete(self, source: str) -> bool:
+        with self._lock:
+            slot = self.slots.pop(source, None)
+            if slot is None:
+                return False
+            self.alive[slot] = False
+            self.documents.pop(source, None)
+            return True
+
+    def memory_bytes(self) -> int:
+        """
+        Returns the memory used by the codes, scales and the alive mask.
+        """
+        return self.codes[:self.size].nbytes + self.scales[:self.size].nbytes + self.size
+
+    def _approximate_scores(
+            self, queries: np.ndarray, codes: np.ndarray, scales: np.ndarray, alive: np.ndarray
+    ) -> np.ndarray:
+        """
+        Scores the given slots for a batch of queries, higher is better. In binary mode the
+        queries are passed as their codes, otherwise as normalized vectors.
+        """
+        size = len(codes)
+        scores = np.empty((len(queries), size), dtype=np.float32)
+        if self.mode == "binary":
+            for row, query_code in enumerate(queries):
+                distances = popcount(codes ^ query_code).sum(axis=1)
+                scores[row] = -distances.astype(np.float32)
+        else:
+            for start in range(0, size, self.block_size):
+                end = min(start + self.block_size, size)
+                block = codes[start:end].astype(np.float32) @ queries.T
+                scores[:, start:end] = (block * scales[start:end, None]).T
+        scores[:, ~alive] = -np.inf
+        return scores
+
+    def search_vectors(self, query_vectors: list[list[float]] | np.ndarray, k: int = 10) -> list[list[Document]]:
+        """
+        Returns the k most similar documents of each query vector: the best candidates by their
+        codes are rescored with the float embeddings from disk.
+
+        Only a snapshot of the index is taken under the lock. Writes append new slots or grow
+        into new arrays and never rewrite the codes of existing slots, so the snapshot is
+        scored without blocking concurrent searches and writes.
+        """
+        queries = self._normalize(np.atleast_2d(np.asarray(query_vectors, dtype=np.float32)))
+        with self._lock:
+            size = self.size
+            if size == 0:
+                return [[] for _ in queries]
+            query_codes = self._encode(queries)[0] if self.mode == "binary" else queries
+            codes, scales, alive = self.codes[:size], self.scales[:size], self.alive[:size].copy()
+            floats, sources, documents = self._floats, self.sources[:size], self.documents
+
+        scores = self._approximate_scores(query_codes, codes, scales, alive)
+        results = []
+        num_candidates = min(max(self.rescore, k), size)
+        for query, query_scores in zip(queries, scores):
+            candidates = np.argpartition(-query_scores, num_candidates - 1)[:num_candidates]
+            candidates = np.sort(candidates[np.isfinite(query_scores[candidates])])
+            exact = floats[candidates] @ query
+            top = candidates[np.argsort(-exact)[:k]]
+            # a review deleted since the snapshot is dropped
+            hits = (documents.get(sources[slot]) for slot in top)
+            results.append([document for document in hits if document is not None])
+        return results
+
+    def search_vector(self, query_vector: list[float], k: int = 10) -> list[Document]:
+        return self.search_vectors([query_vector], k)[0]
+
+    def close(self):
+        """
+        Releases the memory map and removes the float embeddings from disk.
+        """
+        with self._lock:
+            self._floats = None
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+def compare_modes(vectors: np.ndarray, queries: np.ndarray, label: str):
+    """
+    Prints the memory, latency and recall@10 of both quantization modes against exact float search.
+
+    Args:
+        vectors (np.ndarray): The document embeddings.
+        queries (np.ndarray): The query embeddings.
+        label (str): Name of the data set.
+    """
+    import tempfile
+    import time
+
+    documents = [Document(page_content=str(i), metadata={"source": f"review_{i}"}) for i in range(len(vectors))]
+    normalized = QuantizedVectorIndex._normalize(vectors)
+    start = time.perf_counter()
+    exact = np.argsort(-(QuantizedVectorIndex._normalize(queries) @ normalized.T), axis=1)[:, :10]
+    elapsed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    print(f"{label}: {len(vectors)} x {vectors.shape[1]} documents, {len(queries)} queries")
+    print(f"float32: {normalized.nbytes / 2 ** 20:.1f} MB in memory, {elapsed_ms:.1f} ms/query")
+
+    for mode in ("binary", "int8"):
+        for rescore in (100, 300):
+            index = QuantizedVectorIndex(os.path.join(tempfile.mkdtemp(), "vectors.f32"), mode, rescore)
+            index.build(documents, lambda texts: vectors[[int(text) for text in texts]])
+            start = time.perf_counter()
+            results = index.search_vectors(queries, 10)
+            elapsed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+            recall = np.mean([
+                len({doc.metadata["source"] for doc in result} & {f"review_{i}" for i in truth}) / 10
+                for result, truth in zip(results, exact)
+            ])
+            print(
+                f"{mode:<6} rescore {rescore}: {index.memory_bytes() / 2 ** 20:.1f} MB in memory "
+                f"({normalized.nbytes / index.memory_bytes():.0f}x smaller), "
+                f"{elapsed_ms:.1f} ms/query, recall@10 {recall:.3f}"
+            )
+            index.close()
+
+
+if __name__ == "__main__":
+    # Memory, latency and recall@10 of both modes on the stored catalog embeddings, if the
+    # embedding store holds them, and on synthetic clustered vectors
+    from src.index.data_loader import DataLoader
+    from src.index.embedding_store import EmbeddingStore
+
+    rng = np.random.default_rng(0)
+    store = EmbeddingStore(f"{constants.embedding_backend}:{constants.embedding_model_ml}")
+    catalog, found = store.get_matrix(DataLoader().load_coffee_data()["desc_1"].fillna("").astype(str).tolist())
+    catalog = catalog[found]
+    if len(catalog) > 400:
+        # held-out catalog descriptions serve as queries
+        order = rng.permutation(len(catalog))
+        compare_modes(catalog[order[200:]], catalog[order[:200]], "stored catalog embeddings")
+    else:
+        print(f"Only {len(catalog)} catalog embeddings are stored, run a load with the quantized backend first.")
+
+    num_documents, dimension, num_queries = 50000, 768, 200
+    # clustered vectors with a shared component, like sentence embeddings
+    centers = rng.normal(size=(500, dimension)).astype(np.float32)
+    vectors = 0.5 + centers[rng.integers(0, len(centers), num_documents)] + rng.normal(size=(num_documents, dimension)).astype(np.float32)
+    queries = 0.5 + centers[rng.integers(0, len(centers), num_queries)] + rng.normal(size=(num_queries, dimension)).astype(np.float32)
+    compare_modes(vectors, queries, "synthetic clustered vectors")
@@ -1,7 +1,7 @@
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-from langchain.retrievers import EnsembleRetriever
 from langchain_core.documents import Document
 from langchain_core.runnables import RunnableLambda
 
@@ -19,34 +19,136 @@ class Retriever:
         logging.getLogger("langchain.retrievers.multi_query").setLevel(logging.INFO)
 
         self.index = index
-        self.semantic_retriever = self.index.vector_store.as_retriever()
 
         self.bm25_retriever = ElasticBM25Retriever(index.elastic_search, constants.es_index_name)
 
         self.ensemble_retriever = self.initialize_ensemble_retriever()
 
+    @staticmethod
+    def es_hit_to_document(hit: dict) -> Document:
+        return Document(page_content=hit["flavor_description"], metadata=hit)
+
     def initialize_ensemble_retriever(self, vector_weight=0.7, bm25_weight=0.3):
+        from langchain.retrievers import EnsembleRetriever
+
         def wrap_bm25(bm25_retriever):
             return RunnableLambda(lambda query, config: [
-                Document(page_content=doc["flavor_description"], metadata=doc)
+                self.es_hit_to_document(doc)
                 for doc in bm25_retriever.invoke(
                     query,
                     k=config.get("k", 100)
                 )
             ])
 
-        def wrap_semantic(semantic_retriever):
-            return RunnableLambda(lambda query, config: semantic_retriever.invoke(
+        def wrap_semantic(index):
+            # resolve the vector store per query, so searches follow index generation swaps
+            return RunnableLambda(lambda query, config: index.vector_store.as_retriever().invoke(
                 query,
                 config={"k": config.get("k", 100)}
             ))
 
+        def wrap_sharded_semantic(index):
+            return RunnableLambda(lambda query, config: index.active.shards.search_vector(
+                index.vector_store_manager.embeddings.embed_query(query),
+                k=config.get("k", 100)
+            ))
+
+        def wrap_sharded_bm25(index):
+            return RunnableLambda(lambda query, config: index.active.shards.search_lexical(
+                query,
+                k=config.get("k", 100)
+            ))
+
+        def wrap_quantized_semantic(index):
+            return RunnableLambda(lambda query, config: index.active.quantized.search_vector(
+                index.vector_store_manager.embeddings.embed_query(query),
+                k=config.get("k", 100)
+            ))
+
+        if constants.retrieval_backend == "sharded":
+            retrievers = [wrap_sharded_semantic(self.index), wrap_sharded_bm25(self.index)]
+        elif constants.retrieval_backend == "quantized":
+            retrievers = [wrap_quantized_semantic(self.index), wrap_bm25(self.bm25_retriever)]
+        else:
+            retrievers = [wrap_semantic(self.index), wrap_bm25(self.bm25_retriever)]
+
         return EnsembleRetriever(
-            retrievers=[
-                wrap_semantic(self.semantic_retriever),
-                wrap_bm25(self.bm25_retriever)
-            ],
+            retrievers=retrievers,
             weights=[vector_weight, bm25_weight]
         )
 
+    def retrieve(self, query: str, query_vector: list[float], k: int = 100) -> list[Document]:
+        """
+        Retrieves the fused candidates of one query with its precomputed embedding, so a query
+        that is already embedded, e.g. for the semantic cache, is not embedded a second time.
+        The results are fused with the same weighted reciprocal rank fusion as the ensemble retriever.
+
+        Args:
+            query (str): The query, already translated to English.
+            query_vector (list[float]): Its embedding.
+            k (int): Number of candidates per retriever.
+
+        Returns:
+            list[Document]: The fused candidates, best first.
+        """
+        if constants.retrieval_backend == "sharded":
+            shards = self.index.active.shards
+            semantic = shards.search_vector(query_vector, k)
+            lexical = shards.search_lexical(query, k)
+        else:
+            if constants.retrieval_backend == "quantized":
+                semantic = self.index.active.quantized.search_vector(query_vector, k)
+            else:
+                semantic = self.index.vector_store.similarity_search_by_vector(query_vector, k=k)
+            lexical = [self.es_hit_to_document(hit) for hit in self.bm25_retriever.invoke(query, k=k)]
+        return self.ensemble_retriever.weighted_reciprocal_rank([semantic, lexical])
+
+    def retrieve_many(
+            self,
+            queries: list[str],
+            query_vectors: list[list[float]],
+            k: int = 100,
+    ) -> list[list[Document]]:
+        """
+        Retrieves the fused candidates of many queries at once. The sharded backend scores all
+        query vectors with one matrix multiply and all lexical queries in one pass per shard.
+        The quantized backend scores all query vectors against the in-memory codes and sends
+        the lexical queries as one ElasticSearch _msearch request. The remote backend sends the
+        lexical queries as ElasticSearch _msearch requests and the precomputed query vectors to
+        Pinecone concurrently. Both result lists are fused with the same weighted reciprocal
+        rank fusion as the ensemble retriever.
+
+        Args:
+            queries (list[str]): The queries, already translated to English.
+            query_vectors (list[list[float]]): Their embeddings.
+            k (int): Number of candidates per retriever and query.
+
+        Returns:
+            list[list[Document]]: The fused candidates of each query, best first.
+        """
+        if constants.retrieval_backend == "sharded":
+            shards = self.index.active.shards
+            semantic_results = shards.search_vectors(query_vectors, k)
+            lexical_results = shards.search_lexical_many(queries, k)
+        elif constants.retrieval_backend == "quantized":
+            semantic_results = self.index.active.quantized.search_vectors(query_vectors, k)
+            lexical_results = [
+                [self.es_hit_to_document(hit) for hit in hits]
+                for hits in self.bm25_retriever.invoke_many(queries, k=k)
+            ]
+        else:
+            vector_store = self.index.vector_store
+            with ThreadPoolExecutor(max_workers=16) as executor:
+                semantic_futures = [
+                    executor.submit(vector_store.similarity_search_by_vector, vector, k=k) for vector in query_vectors
+                ]
+                lexical_results = [
+                    [self.es_hit_to_document(hit) for hit in hits]
+                    for hits in self.bm25_retriever.invoke_many(queries, k=k)
+                ]
+                semantic_results = [future.result() for future in semantic_futures]
 
+        return [
+            self.ensemble_retriever.weighted_reciprocal_rank([semantic, lexical])
+            for semantic, lexical in zip(semantic_results, lexical_results)
+        ]
@@ -0,0 +1,203 @@
+import re
+from collections import Counter
+from multiprocessing.connection import Connection
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Lower-cases the text and splits it into alphanumeric tokens.
+
+    Args:
+        text (str): The text to tokenize.
+
+    Returns:
+        list[str]: The tokens.
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class Shard:
+    """
+    One partition of the local index: the documents, their normalized embeddings and
+    BM25 postings. Slots of deleted or replaced documents are tombstoned.
+
+    Attributes:
+        documents (list[dict | None]): Page content and metadata of each slot.
+        slots (dict[str, int]): Slot of each live source id.
+        vectors (np.ndarray): Normalized embeddings, one row per slot.
+        alive (np.ndarray): Whether a slot holds a live document.
+        postings (dict[str, tuple[list[int], list[int]]]): Slots and term frequencies per term.
+    """
+
+    k1 = 1.5
+    b = 0.75
+
+    def __init__(self):
+        self.documents: list[dict | None] = []
+        self.slots: dict[str, int] = {}
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.size = 0
+        self.alive = np.zeros(0, dtype=bool)
+        self.lengths = np.zeros(0, dtype=np.float32)
+        self.postings: dict[str, tuple[list[int], list[int]]] = {}
+        self.compiled_postings: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self.idf: dict[str, float] = {}
+        self.default_idf = 0.0
+        self.avg_length = 1.0
+
+    def _ensure_capacity(self, rows: int, dimension: int):
+        capacity = len(self.alive)
+        if self.size + rows <= capacity and self.vectors.shape[1] == dimension:
+            return
+        new_capacity = max(self.size + rows, capacity * 2, 16)
+        vectors = np.zeros((new_capacity, dimension), dtype=np.float32)
+        if self.size:
+            vectors[:self.size] = self.vectors[:self.size]
+        self.vectors = vectors
+        self.alive = np.concatenate([self.alive[:self.size], np.zeros(new_capacity - self.size, dtype=bool)])
+        self.lengths = np.concatenate([self.lengths[:self.size], np.zeros(new_capacity - self.size, dtype=np.float32)])
+
+    def add(self, documents: list[dict], vectors: np.ndarray) -> Counter:
+        """
+        Appends documents to the shard, tombstoning older versions of the same source.
+
+        Args:
+            documents (list[dict]): Documents with "page_content" and "metadata".
+            vectors (np.ndarray): Their embeddings, one row per document.
+
+        Returns:
+            Counter: Document frequency of each term in the added documents.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(documents), -1)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+        self._ensure_capacity(len(documents), vectors.shape[1])
+
+        document_frequency = Counter()
+        for document, vector in zip(documents, vectors):
+            source = document["metadata"]["source"]
+            self.delete(source)
+
+            slot = self.size
+            self.size += 1
+            self.documents.append(document)
+            self.slots[source] = slot
+            self.vectors[slot] = vector
+            self.alive[slot] = True
+
+            term_frequency = Counter(tokenize(document["page_content"]))
+            self.lengths[slot] = sum(term_frequency.values())
+            for term, frequency in term_frequency.items():
+                slots, frequencies = self.postings.setdefault(term, ([], []))
+                slots.append(slot)
+                frequencies.append(frequency)
+                self.compiled_postings.pop(term, None)
+            document_frequency.update(term_frequency.keys())
+
+        return document_frequency
+
+    def delete(self, source: str) -> bool:
+        slot = self.slots.pop(source, None)
+        if slot is None:
+            return False
+        self.alive[slot] = False
+        self.documents[slot] = None
+        return True
+
+    def set_statistics(self, document_frequency: dict[str, int], num_documents: int, avg_length: float):
+        """
+        Sets the corpus-wide BM25 statistics, so the scores of all shards are comparable.
+        """
+        self.idf = {
+            term: float(np.log(1 + (num_documents - frequency + 0.5) / (frequency + 0.5)))
+            for term, frequency in document_frequency.items()
+        }
+        # terms first seen after the build are treated as occurring in a single document
+        self.default_idf = float(np.log(1 + (num_documents - 0.5) / 1.5))
+        self.avg_length = max(avg_length, 1.0)
+
+    def _top_k(self, scores: np.ndarray, k: int) -> list[tuple[float, str]]:
+        # only scores and source ids are sent back, the coordinator holds the documents
+        scores = np.where(self.alive[:self.size], scores, -np.inf)
+        k = min(k, self.size)
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        return [
+            (float(scores[slot]), self.documents[slot]["metadata"]["source"])
+            for slot in top if np.isfinite(scores[slot])
+        ]
+
+    def search_vector(self, vector: np.ndarray, k: int) -> list[tuple[float, str]]:
+        vector = np.asarray(vector, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        return self._top_k(self.vectors[:self.size] @ vector, k)
+
+    def search_vectors(self, vectors: np.ndarray, k: int) -> list[list[tuple[float, str]]]:
+        """
+        Scores a batch of query vectors with one matrix multiply and returns the top k of each.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        scores = self.vectors[:self.size] @ (vectors / np.where(norms == 0, 1, norms)).T
+        return [self._top_k(scores[:, column], k) for column in range(len(vectors))]
+
+    def search_lexical(self, tokens: list[str], k: int) -> list[tuple[float, str]]:
+        scores = np.zeros(self.size, dtype=np.float32)
+        length_norm = self.k1 * (1 - self.b + self.b * self.lengths[:self.size] / self.avg_length)
+        for term in set(tokens):
+            if term not in self.postings:
+                continue
+            if term not in self.compiled_postings:
+                slots, frequencies = self.postings[term]
+                self.compiled_postings[term] = (np.asarray(slots), np.asarray(frequencies, dtype=np.float32))
+            slots, frequencies = self.compiled_postings[term]
+            scores[slots] += self.idf.get(term, self.default_idf) * frequencies * (self.k1 + 1) / (frequencies + length_norm[slots])
+        scores[scores == 0] = -np.inf
+        return self._top_k(scores, k)
+
+
+def run_shard(connection: Connection):
+    """
+    Serves commands for one shard until it receives "close". Runs in a worker process.
+    Every command carries a request id that is sent back with its result, so the coordinator
+    can have several requests in flight on the same pipe.
+
+    Args:
+        connection (Connection): Pipe to the coordinator.
+    """
+    shard = Shard()
+    while True:
+        request_id, command, payload = connection.recv()
+        try:
+            if command == "add":
+                result = shard.add(*payload)
+            elif command == "delete":
+                result = shard.delete(payload)
+            elif command == "stats":
+                alive = shard.alive[:shard.size]
+                result = (int(alive.sum()), float(shard.lengths[:shard.size][alive].sum()))
+            elif command == "set_statistics":
+                result = shard.set_statistics(*payload)
+            elif command == "search_vector":
+                result = shard.search_vector(*payload)
+            elif command == "search_lexical":
+                result = shard.search_lexical(*payload)
+            elif command == "search_vectors":
+                result = shard.search_vectors(*payload)
+            elif command == "search_lexical_many":
+                queries, k = payload
+                result = [shard.search_lexical(tokens, k) for tokens in queries]
+            elif command == "close":
+                connection.send((request_id, "ok", None))
+                break
+            else:
+                raise ValueError(f"Unknown shard command: {command}")
+            connection.send((request_id, "ok", result))
+        except Exception as e:
+            connection.send((request_id, "error", repr(e)))
+    connection.close()
@@ -0,0 +1,220 @@
+import heapq
+import itertools
+import multiprocessing
+import os
+import threading
+import zlib
+from collections import Counter
+from concurrent.futures import Future
+from typing import Callable
+
+import numpy as np
+from langchain_core.documents import Document
+
+from src.constants import constants
+from src.logger.custom_logger import CustomLogger
+from src.retrieve.shard_worker import run_shard, tokenize
+
+
+class ShardedIndex:
+    """
+    Coordinator of a local index that is partitioned across worker processes.
+    Every shard holds its part of the catalog, the document embeddings and the BM25 postings.
+    Queries are scattered to all shards and the per-shard top-k lists are merged.
+
+    Requests are tagged with an id and every shard pipe has a receiver thread that hands each
+    result to its waiting caller, so concurrent queries are pipelined: while one shard still
+    scores a query, the shards that are done already work on the next one.
+
+    Documents are assigned to shards by a stable hash of their source id, so upserts and
+    deletes of a single review only touch one shard. BM25 statistics are computed over the
+    whole corpus at build time and are not refreshed by single review writes.
+
+    Attributes:
+        num_shards (int): Number of worker processes.
+        logger (Logger): logger instance for logging information and errors.
+        resolve (Callable[[str], Document | None]): Looks up the catalog document of a source id.
+                                                    Shards only return source ids, which are
+                                                    resolved against the catalog of the caller.
+    """
+
+    def __init__(self, resolve: Callable[[str], Document | None], num_shards: int = constants.num_shards):
+        """
+        Starts one worker process per shard.
+
+        Args:
+            resolve (Callable[[str], Document | None]): Looks up the catalog document of a source id,
+                                                        None if it is not in the catalog.
+            num_shards (int): Number of shards. Defaults to the NUM_SHARDS setting.
+        """
+        self.log_dir = os.path.join(constants.root_dir, "logs")
+        self.logger = CustomLogger(self.log_dir, "logs.log").logger
+        self.num_shards = max(1, num_shards)
+        self.resolve = resolve
+        self._request_ids = itertools.count()
+        self._pending: dict[tuple[int, int], Future] = {}
+        self._pending_lock = threading.Lock()
+
+        context = multiprocessing.get_context("spawn")
+        self._connections = []
+        self._send_locks = []
+        self._processes = []
+        for shard in range(self.num_shards):
+            parent_connection, child_connection = context.Pipe()
+            process = context.Process(target=run_shard, args=(child_connection,), daemon=True)
+            process.start()
+            self._connections.append(parent_connection)
+            self._send_locks.append(threading.Lock())
+            self._processes.append(process)
+            threading.Thread(target=self._receive, args=(shard,), daemon=True).start()
+        self.logger.info(f"Started {self.num_shards} index shards.")
+
+    def _receive(self, shard: int):
+        """
+        Hands the results of one shard to the waiting callers until the pipe is closed.
+        """
+        connection = self._connections[shard]
+        while True:
+            try:
+                request_id, status, result = connection.recv()
+            except (EOFError, OSError) as e:
+                with self._pending_lock:
+                    orphaned = [key for key in self._pending if key[0] == shard]
+                    futures = [self._pending.pop(key) for key in orphaned]
+                for future in futures:
+                    future.set_result(("error", f"connection closed: {e!r}"))
+                return
+            with self._pending_lock:
+                future = self._pending.pop((shard, request_id), None)
+            if future is not None:
+                future.set_result((status, result))
+
+    def shard_for(self, source: str) -> int:
+        return zlib.crc32(source.encode("utf-8")) % self.num_shards
+
+    def _scatter(self, requests: dict[int, tuple[str, object]]) -> dict[int, object]:
+        """
+        Sends one command to each of the given shards and waits for all results.
+        The shards process their commands in parallel, and other callers can send
+        their commands while this one waits.
+        """
+        request_id = next(self._request_ids)
+        futures = {}
+        for shard, (command, payload) in requests.items():
+            future = Future()
+            with self._pending_lock:
+                self._pending[(shard, request_id)] = future
+            with self._send_locks[shard]:
+                self._connections[shard].send((request_id, command, payload))
+            futures[shard] = future
+        responses = {shard: future.result() for shard, future in futures.items()}
+
+        for shard, (status, result) in responses.items():
+            if status != "ok":
+                raise RuntimeError(f"Shard {shard} failed: {result}")
+        return {shard: result for shard, (_, result) in responses.items()}
+
+    def _broadcast(self, command: str, payload: object = None) -> list[object]:
+        results = self._scatter({shard: (command, payload) for shard in range(self.num_shards)})
+        return [results[shard] for shard in range(self.num_shards)]
+
+    @staticmethod
+    def _serialize(document: Document) -> dict:
+        return {"page_content": document.page_content, "metadata": document.metadata}
+
+    def build(
+            self,
+            documents: list[Document],
+            embed: Callable[[list[str]], np.ndarray],
+            batch_size: int = 2048,
+    ):
+        """
+        Partitions the documents and their embeddings across the shards and
+        distributes the corpus-wide BM25 statistics. The documents are embedded and sent
+        in batches, so the coordinator never holds the embeddings of the whole catalog.
+
+        Args:
+            documents (list[Document]): The review documents.
+            embed (Callable[[list[str]], np.ndarray]): Embeds a batch of page contents,
+                                                       one row per text.
+            batch_size (int): Number of documents embedded and sent at once.
+        """
+        document_frequency = Counter()
+        for start in range(0, len(documents), batch_size):
+            batch = documents[start:start + batch_size]
+            vectors = np.asarray(embed([document.page_content for document in batch]), dtype=np.float32)
+            partitions: dict[int, list[int]] = {}
+            for position, document in enumerate(batch):
+                partitions.setdefault(self.shard_for(document.metadata["source"]), []).append(position)
+
+            frequencies = self._scatter({
+                shard: ("add", ([self._serialize(batch[p]) for p in positions], vectors[positions]))
+                for shard, positions in partitions.items()
+            })
+            document_frequency += sum(frequencies.values(), Counter())
+        self._update_statistics(document_frequency)
+        self.logger.info(f"Built {self.num_shards} shards with {len(documents)} documents.")
+
+    def _update_statistics(self, document_frequency: Counter):
+        stats = self._broadcast("stats")
+        num_documents = sum(count for count, _ in stats)
+        avg_length = sum(length for _, length in stats) / max(num_documents, 1)
+        self._broadcast("set_statistics", (dict(document_frequency), num_documents, avg_length))
+
+    def upsert(self, document: Document, vector: list[float]):
+        shard = self.shard_for(document.metadata["source"])
+        self._scatter({shard: ("add", ([self._serialize(document)], np.asarray([vector])))})
+
+    def delete(self, source: str) -> bool:
+        shard = self.shard_for(source)
+        return self._scatter({shard: ("delete", source)})[shard]
+
+    def _merge(self, hits: list[list[tuple[float, str]]], k: int) -> list[Document]:
+        merged = heapq.nlargest(k, (hit for shard_hits in hits for hit in shard_hits), key=lambda hit: hit[0])
+        documents = (self.resolve(source) for _, source in merged)
+        return [document for document in documents if document is not None]
+
+    def _gather(self, command: str, query: object, k: int) -> list[Document]:
+        return self._merge(self._broadcast(command, (query, k)), k)
+
+    def search_vector(self, query_vector: list[float], k: int = 10) -> list[Document]:
+        """
+        Returns the k documents with the highest cosine similarity over all shards.
+        """
+        return self._gather("search_vector", np.asarray(query_vector, dtype=np.float32), k)
+
+    def search_lexical(self, query: str, k: int = 10) -> list[Document]:
+        """
+        Returns the k documents with the highest BM25 score over all shards.
+        """
+        return self._gather("search_lexical", tokenize(query), k)
+
+    def _gather_many(self, command: str, queries: object, k: int) -> list[list[Document]]:
+        hits = self._broadcast(command, (queries, k))
+        return [self._merge(query_hits, k) for query_hits in zip(*hits)]
+
+    def search_vectors(self, query_vectors: list[list[float]] | np.ndarray, k: int = 10) -> list[list[Document]]:
+        """
+        Returns the k most similar documents of each query vector. Every shard scores
+        the whole batch with a single matrix multiply.
+        """
+        return self._gather_many("search_vectors", np.asarray(query_vectors, dtype=np.float32), k)
+
+    def search_lexical_many(self, queries: list[str], k: int = 10) -> list[list[Document]]:
+        """
+        Returns the k documents with the highest BM25 score of each query,
+        with one round trip to every shard for the whole batch.
+        """
+        return self._gather_many("search_lexical_many", [tokenize(query) for query in queries], k)
+
+    def close(self):
+        """
+        Stops all worker processes.
+        """
+        try:
+            self._broadcast("close")
+        except (OSError, EOFError, RuntimeError) as e:
+            self.logger.warning(f"Error while closing shards: {e}")
+        for process in self._processes:
+            process.join(timeout=5)
+        self.logger.info(f"Stopped {self.num_shards} index shards.")
@@ -1,14 +1,23 @@
 import os
+import time
 from typing import List
 
+import numpy as np
 from langchain_core.documents import Document
 
+from src.cache.result_store import ResultStore
+from src.cache.semantic_cache import SemanticQueryCache
 from src.constants import constants
 from src.index.index import Index
 from src.inference.llm_inference import LLMInference
-from src.logger.custom_logger import CustomLogger
+from src.logger.custom_logger import CustomLogger, LazyArgument
 from src.prompt_builder.prompt_builder import PromptBuilder
+from src.rank.business_signals import SORT_MODES
+from src.rank.cross_encoder import CrossEncoderReranker
+from src.rank.mmr import diversify, maximal_marginal_relevance, rank_relevance
 from src.retrieve.retriever import Retriever
+from src.serving.admission_controller import AdmissionController
+from src.serving.single_flight import SingleFlight
 from src.translator.translator import Translator
 
 
@@ -20,8 +29,14 @@ class SearchEngine:
     Attributes:
         logger (logger): logger instance for logging information and errors.
         retriever (Retriever): Instance of the Retriever class for document retrieval.
-        llm_inference (LLMInference): Instance of LLMInference for generating answers.
+        llm_inference (LLMInference): Instance of LLMInference for generating answers, created on first use.
         index (Index): Instance of the Index class for managing the document index.
+        query_cache (SemanticQueryCache): Cache of recent search responses by query embedding.
+        result_store (ResultStore): Complete rankings of recent searches, for fetching further pages.
+        single_flight (SingleFlight): Coalesces concurrent identical searches and explanations.
+        admission (AdmissionController): Bounds the searches and explanations processed at once.
+        mmr_lambda (float): Relevance-diversity trade-off of the first page, 1.0 disables diversification.
+        reranker (CrossEncoderReranker): Optional local cross-encoder reranking of the top candidates.
     """
 
     def __init__(self):
@@ -31,46 +46,379 @@ class SearchEngine:
         """
         self.log_dir = os.path.join(constants.root_dir, "logs")
         self.logger = CustomLogger(self.log_dir, "logs.log").logger
+        self.hot_path_logger = CustomLogger(
+            self.log_dir, "logs.log", name="search", sample_rate=constants.log_sample_rate
+        ).logger
         self.logger.info("Initializing Search Engine...")
 
         self.index = Index()
         self.index.index_documents()
         self.retriever = Retriever(self.index)
         self.prompt_builder = PromptBuilder()
-        self.llm_inference = LLMInference(
-            system_instruction=self.prompt_builder.get_system_prompt(),
-            model_name="gemini-2.0-flash"
-        )
+        self._llm_inference = None
         self.translator = Translator()
         self.num_of_search_results = 10
         self.num_of_unfiltered_search_results = 200
-        self.user_language = "en"
+        self.query_cache = SemanticQueryCache()
+        self.result_store = ResultStore()
+        self.single_flight = SingleFlight()
+        self.mmr_lambda = constants.mmr_lambda
+        self.reranker = CrossEncoderReranker()
+        self.admission = AdmissionController()
         self.logger.info("Search Engine initialized successfully.")
 
-    def search(self, query: str, filters: dict[str, str]) -> list[Document]:
-        try:
-            self.logger.info(f"Processing query: {query}")
-            translation_dict = self.translator.translate_text(query, "en")
-            query = translation_dict["translated_text"]
-            self.user_language = translation_dict["detected_source_language"]
-            search_results = self.retriever.ensemble_retriever.invoke(
-                query,
-                config={"k": self.num_of_unfiltered_search_results}
+    @property
+    def llm_inference(self) -> LLMInference:
+        # the Gemini SDK is only loaded once the first explanation is requested
+        if self._llm_inference is None:
+            self._llm_inference = LLMInference(
+                system_instruction=self.prompt_builder.get_system_prompt(),
+                model_name="gemini-2.0-flash"
             )
+        return self._llm_inference
+
+    def translate_query(self, query: str) -> tuple[str, str]:
+        """
+        Translates the query to English, the language of the catalog.
+
+        Args:
+            query (str): The user's query in any language.
+
+        Returns:
+            tuple[str, str]: The English query and the detected language of the query.
+        """
+        translation_dict = self.translator.translate_text(query, "en")
+        return translation_dict["translated_text"], translation_dict["detected_source_language"]
+
+    def retrieve_candidates(self, english_query: str, query_vector: list[float]) -> list[Document]:
+        """
+        Returns the fused, deduplicated and unfiltered candidates of a query.
+
+        Args:
+            english_query (str): The query, translated to English.
+            query_vector (list[float]): The embedding of the English query.
+
+        Returns:
+            list[Document]: The candidates, best first.
+        """
+        search_results = self.retriever.retrieve(
+            english_query, query_vector, k=self.num_of_unfiltered_search_results
+        )
+
+        # remove duplicate search results
+        return self.remove_duplicate_results(search_results)
+
+    def search(
+            self,
+            query: str,
+            filters: dict[str, str],
+            use_cache: bool = True,
+            sort: str = "relevance",
+    ) -> tuple[list[Document], str | None]:
+        """
+        Searches and returns the first page of results.
+
+        Args:
+            query (str): The user's query.
+            filters (dict[str, str]): Metadata filters, e.g. {"roast": "Dark"}.
+            use_cache (bool): Whether the semantic cache may be used for this request.
+            sort (str): One of SORT_MODES: "relevance", "top_rated", "best_value" or "newest".
+
+        Returns:
+            tuple[list[Document], str | None]: The first page and the cursor of the next page,
+                                               None if there are no more results.
+        """
+        results, _, cursor, _ = self.search_with_facets(
+            query, filters, with_facets=False, use_cache=use_cache, sort=sort
+        )
+        return results, cursor
+
+    def search_with_facets(
+            self,
+            query: str,
+            filters: dict[str, str],
+            with_facets: bool = True,
+            use_cache: bool = True,
+            sort: str = "relevance",
+    ) -> tuple[list[Document], dict[str, dict[str, int]], str | None, str]:
+        """
+        Searches and counts the facet values of the query's candidates in one pass.
+
+        Responses are cached by the embedding of the English query: a query that is a
+        near-duplicate of a recent query with the same filters, in any language, is answered
+        from the semantic cache without retrieval. The complete filtered ranking is kept in the result store, so further
+        pages are served with next_page. Concurrent identical searches share one computation,
+        and searches beyond the engine's capacity are rejected.
+
+        If RERANK_TOP_N is set, the top filtered candidates are reordered by a local cross-encoder
+        before sorting. Every sort mode except "relevance" rescores the fused candidates with the rating, value
+        and recency boosts of the index generation, and replaces the diversification of the first page.
+
+        Args:
+            query (str): The user's query.
+            filters (dict[str, str]): Metadata filters, e.g. {"roast": "Dark"}.
+            with_facets (bool): Whether to compute the facet counts.
+            use_cache (bool): Whether the semantic cache may be used for this request.
+            sort (str): One of SORT_MODES.
+
+        Returns:
+            tuple[list[Document], dict[str, dict[str, int]], str | None, str]:
+                The first page, the facet counts, the next page cursor and the detected language
+                of the query, in which explanations are shown to the user.
+
+        Raises:
+            ValueError: If the sort mode is unknown.
+            Overloaded: If the search is shed by the admission controller.
+        """
+        if sort not in SORT_MODES:
+            raise ValueError(f"Unknown sort mode: {sort}")
+        key = ("search", query, tuple(sorted(filters.items())), with_facets, use_cache, sort)
+        return self.single_flight.do(
+            key, lambda: self._admitted(self._search_with_facets, query, filters, with_facets, use_cache, sort)
+        )
+
+    def _admitted(self, function, *args):
+        with self.admission.admit():
+            return function(*args)
+
+    def _search_with_facets(
+            self,
+            query: str,
+            filters: dict[str, str],
+            with_facets: bool,
+            use_cache: bool,
+            sort: str,
+    ) -> tuple[list[Document], dict[str, dict[str, int]], str | None, str]:
+        try:
+            generation = self.index.active
+            # keyed on the write counter, so upserts and deletes invalidate cached rankings
+            cache_key = (self.index.generation, tuple(sorted(filters.items())), sort)
+            cacheable = use_cache and self.query_cache.enabled
+            self.hot_path_logger.info("Processing query: %s", query)
+            generation.prefix_index.record_query(query)
+            english_query, language = self.translate_query(query)
 
-            # remove duplicate search results
-            unique_results = self.remove_duplicate_results(search_results)
+            # embedded once, for the cache lookup and for retrieval
+            query_vector = self.index.vector_store_manager.embeddings.embed_query(english_query)
+            if cacheable:
+                cached = self.query_cache.lookup(query_vector, cache_key)
+                if cached is not None:
+                    ranking, facets = cached
+                    self.hot_path_logger.info(
+                        "Served query from the semantic cache: %s (hit rate %s)",
+                        query,
+                        LazyArgument(lambda: f"{self.query_cache.stats()['hit_rate']:.2f}"),
+                    )
+                    results, cursor = self.result_store.first_page(ranking, self.num_of_search_results)
+                    return results, facets if with_facets else {}, cursor, language
 
-            # filter search results
-            filtered_results = self.filter_results(unique_results, filters)
+            unique_results = self.retrieve_candidates(english_query, query_vector)
 
-            print(filtered_results)
-            return filtered_results[:self.num_of_search_results]
+            # filter search results, then rerank the top candidates locally
+            filtered_results = self.reranker.rerank(english_query, self.filter_results(unique_results, filters))
+
+            self.hot_path_logger.debug(
+                "Search returned %d filtered results: %s",
+                len(filtered_results),
+                LazyArgument(lambda: [doc.metadata.get("source") for doc in filtered_results]),
+            )
+            # cached responses always carry the facet counts, so later hits can return them
+            if with_facets or cacheable:
+                facets = self.facet_counts(filters, unique_results)
+            else:
+                facets = {}
+            ranking = tuple(self.rank(filtered_results, sort))
+            if cacheable:
+                self.query_cache.store(query_vector, cache_key, (ranking, facets))
+            results, cursor = self.result_store.first_page(ranking, self.num_of_search_results)
+            return results, facets if with_facets else {}, cursor, language
 
         except Exception as e:
             self.logger.error(f"Error during the search process: {e}")
             raise
 
+    def search_many(
+            self,
+            queries: list[str],
+            filters: dict[str, str],
+            sort: str = "relevance",
+    ) -> list[list[Document]]:
+        """
+        Searches many queries at once, e.g. for bulk scoring jobs. The queries are translated
+        in batched requests and embedded in one model call, and retrieval runs as one batch
+        per backend. Batch queries are neither cached nor recorded for typeahead.
+
+        Args:
+            queries (list[str]): The queries in any language.
+            filters (dict[str, str]): Metadata filters applied to every query.
+            sort (str): One of SORT_MODES, applied to every query.
+
+        Returns:
+            list[list[Document]]: The top results of each query, in query order.
+
+        Raises:
+            ValueError: If the sort mode is unknown.
+        """
+        if sort not in SORT_MODES:
+            raise ValueError(f"Unknown sort mode: {sort}")
+        if not queries:
+            return []
+        try:
+            start = time.perf_counter()
+            translated = [
+                translation["translated_text"] for translation in self.translator.translate_texts(queries, "en")
+            ]
+            query_vectors = self.index.vector_store_manager.embeddings.embed_queries(translated)
+            candidate_lists = self.retriever.retrieve_many(
+                translated, query_vectors, k=self.num_of_unfiltered_search_results
+            )
+            results = [
+                self.rank(
+                    self.reranker.rerank(
+                        query, self.filter_results(self.remove_duplicate_results(candidates), filters)
+                    ),
+                    sort,
+                )[:self.num_of_search_results]
+                for query, candidates in zip(translated, candidate_lists)
+            ]
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.logger.info(f"Searched {len(queries)} queries in {elapsed_ms:.0f} ms.")
+            return results
+
+        except Exception as e:
+            self.logger.error(f"Error during the batch search process: {e}")
+            raise
+
+    def rank(self, ranking: list[Document], sort: str) -> list[Document]:
+        """
+        Final ranking stage after fusion, filtering and reranking: the relevance sort diversifies
+        the first page, the other sort modes rescore all candidates with their business signals.
+
+        Args:
+            ranking (list[Document]): The fused and filtered ranking.
+            sort (str): One of SORT_MODES.
+
+        Returns:
+            list[Document]: The final ranking.
+        """
+        if sort == "relevance":
+            return self.diversify(ranking)
+        generation = self.index.active
+        positions = [generation.chunk_positions.get(doc.metadata.get("source"), -1) for doc in ranking]
+        return generation.signals.rank(ranking, positions, sort)
+
+    def diversify(self, ranking: list[Document]) -> list[Document]:
+        """
+        Reorders the first page of a ranking with Maximal Marginal Relevance over the candidate
+        embeddings, so near-identical coffees do not crowd out the others. The relevance of each
+        candidate is its reciprocal rank in the incoming ranking, so the fused and reranked order
+        is kept wherever diversity does not outweigh it. The remaining results keep their order.
+
+        Only embeddings from the embedding store are used, the model is never run on the
+        request thread. Candidates without a stored embedding keep their rank positions and
+        the stored ones are diversified among the remaining positions.
+
+        Args:
+            ranking (list[Document]): The fused, filtered and reranked ranking.
+
+        Returns:
+            list[Document]: The diversified ranking.
+        """
+        if self.mmr_lambda >= 1 or len(ranking) <= 1:
+            return ranking
+        candidates = ranking[:self.num_of_unfiltered_search_results]
+        vectors, found = self.index.vector_store_manager.embeddings.store.get_matrix(
+            [doc.page_content for doc in candidates]
+        )
+        stored = np.flatnonzero(found)
+        if len(stored) <= 1:
+            return ranking
+        selected = maximal_marginal_relevance(
+            rank_relevance(len(candidates))[stored], vectors[stored], self.num_of_search_results, self.mmr_lambda
+        )
+        diversified = iter(diversify([candidates[i] for i in stored], selected))
+        candidates = [next(diversified) if is_stored else doc for doc, is_stored in zip(candidates, found)]
+        return candidates + ranking[len(candidates):]
+
+    def next_page(self, cursor: str) -> tuple[list[Document], str | None]:
+        """
+        Returns the next page of a previous search from memory, without calling any backend.
+        Pages are sliced from the same stored ranking, so the order is stable across pages.
+
+        Args:
+            cursor (str): The cursor returned with the previous page.
+
+        Returns:
+            tuple[list[Document], str | None]: The page and the cursor of the next page,
+                                               None if there are no more results.
+
+        Raises:
+            KeyError: If the cursor has expired, in which case the search has to be run again.
+        """
+        return self.result_store.page(cursor, self.num_of_search_results)
+
+    def facet_counts(
+            self,
+            filters: dict[str, str] | None = None,
+            candidates: list[Document] | None = None,
+    ) -> dict[str, dict[str, int]]:
+        """
+        Counts roast, origin, country, price and rating values within a candidate set,
+        honouring the filters on the other fields. Computed from in-memory bitmaps.
+
+        Args:
+            filters (dict[str, str], optional): The active filters.
+            candidates (list[Document], optional): The unfiltered candidates of a query.
+                                                   Defaults to the whole catalog.
+
+        Returns:
+            dict[str, dict[str, int]]: Non-zero counts per field and value.
+        """
+        generation = self.index.active
+        positions = None
+        if candidates is not None:
+            positions = [
+                generation.chunk_positions[doc.metadata["source"]]
+                for doc in candidates
+                if doc.metadata.get("source") in generation.chunk_positions
+            ]
+        return generation.facets.counts(filters, positions)
+
+    def suggest(self, prefix: str, k: int = 10) -> list[str]:
+        """
+        Returns typeahead suggestions from tasting notes, coffee names, roasters and past queries.
+        Served from memory without calling any backend.
+
+        Args:
+            prefix (str): The typed prefix.
+            k (int): Maximum number of suggestions.
+
+        Returns:
+            list[str]: The suggestions, most frequent first.
+        """
+        return self.index.active.prefix_index.complete(prefix, k)
+
+    def similar(self, source: str, k: int = 10) -> list[Document]:
+        """
+        Returns the coffees most similar to the given one from the precomputed neighbor graph,
+        without translation, embedding or retrieval calls.
+
+        Args:
+            source (str): The source id of the coffee, e.g. "review_42".
+            k (int): Number of similar coffees.
+
+        Returns:
+            list[Document]: The similar coffees, most similar first.
+        """
+        generation = self.index.active
+        if generation.neighbors is None:
+            return []
+        return [
+            generation.chunks[generation.chunk_positions[neighbor]]
+            for neighbor, _ in generation.neighbors.similar(source, k)
+            if neighbor in generation.chunk_positions
+        ]
+
     def filter_results(self, results: List[Document], filters: dict[str, str]) -> List[Document]:
         filtered_results = []
 
@@ -90,9 +438,6 @@ class SearchEngine:
         seen_ids = set()
         deduped = []
         for doc in results:
-            if len(deduped) >= self.num_of_search_results:
-                break
-
             doc_id = doc.metadata.get("source")
             if doc_id and doc_id not in seen_ids:
                 seen_ids.add(doc_id)
@@ -101,18 +446,37 @@ class SearchEngine:
         return deduped
 
     def explain_result(self, query: str, search_result: Document) -> str:
+        key = ("explain", query, search_result.metadata.get("source"), search_result.page_content)
+        return self.single_flight.do(key, lambda: self._admitted(self._explain_result, query, search_result))
+
+    def _explain_result(self, query: str, search_result: Document) -> str:
         prompt = self.prompt_builder.create_user_content(query=query, search_result=search_result)
         explanation = self.llm_inference.inference(prompt)
-        self.logger.info(f"Generated explanation: {explanation}")
+        self.hot_path_logger.info("Generated explanation: %s", explanation)
         return explanation
 
+    def request_stats(self) -> dict[str, float]:
+        """
+        Returns the counters of request coalescing, admission control and reranking.
+        """
+        return {
+            "executed": self.single_flight.executed,
+            "coalesced": self.single_flight.coalesced,
+            "admitted": self.admission.admitted,
+            "shed": self.admission.shed,
+            "active": self.admission.active,
+            "queued": self.admission.queued,
+            **{f"rerank_{key}": value for key, value in self.reranker.stats().items()},
+        }
+
     def update_index(self):
         """
-        Updates the document index by reloading the data.
+        Updates the document index by rebuilding it in a shadow generation.
+        Searches keep being served from the current generation until the rebuild is swapped in.
         """
         try:
             self.logger.info("Updating the document index...")
-            self.index.index_documents()
+            self.index.rebuild_index()
             self.logger.info("Document index updated successfully.")
         except Exception as e:
             self.logger.error(f"Error updating the document index: {e}")
@@ -126,9 +490,12 @@ if __name__ == "__main__":
         "roast": "Dark",
     }
 
-    results = search_engine.search(query, filters)
+    results, _, cursor, language = search_engine.search_with_facets(query, filters, with_facets=False)
     for result in results:
         print(result)
+    if cursor is not None:
+        for result in search_engine.next_page(cursor)[0]:
+            print(result)
     explanation = search_engine.explain_result(query, results[0])
-    translation_dict = search_engine.translator.translate_text(explanation, target_language=search_engine.user_language)
+    translation_dict = search_engine.translator.translate_text(explanation, target_language=language)
     print(translation_dict["translated_text"])
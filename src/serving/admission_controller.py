@@ -0,0 +1,85 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from src.constants import constants
+
+
+class Overloaded(Exception):
+    """
+    Raised when a request is shed because the search engine is at capacity.
+    """
+
+
+class AdmissionController:
+    """
+    Bounds the number of requests that are processed at once. Requests beyond that wait in
+    a bounded queue. When the queue is full, or a request has waited longer than the queue
+    timeout, the request is rejected right away with Overloaded, so overload degrades to
+    fast rejections instead of every request timing out.
+
+    Attributes:
+        max_concurrent (int): Maximum number of requests processed at once.
+        max_queued (int): Maximum number of waiting requests.
+        queue_timeout (float): Maximum seconds a request waits for a slot.
+        admitted (int): Number of admitted requests.
+        shed (int): Number of rejected requests.
+        active (int): Number of requests being processed.
+        queued (int): Number of waiting requests.
+    """
+
+    def __init__(
+            self,
+            max_concurrent: int = constants.max_concurrent_requests,
+            max_queued: int = constants.max_queued_requests,
+            queue_timeout: float = constants.queue_timeout_seconds,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.admitted = 0
+        self.shed = 0
+        self.active = 0
+        self.queued = 0
+        self._condition = threading.Condition()
+
+    def _acquire(self):
+        with self._condition:
+            if self.active >= self.max_concurrent:
+                if self.queued >= self.max_queued:
+                    self.shed += 1
+                    raise Overloaded(f"Request queue is full ({self.queued} waiting).")
+
+                self.queued += 1
+                deadline = time.monotonic() + self.queue_timeout
+                try:
+                    while self.active >= self.max_concurrent:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.shed += 1
+                            raise Overloaded(f"No free slot within {self.queue_timeout:.1f} s.")
+                        self._condition.wait(remaining)
+                finally:
+                    self.queued -= 1
+
+            self.active += 1
+            self.admitted += 1
+
+    def _release(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+    @contextmanager
+    def admit(self):
+        """
+        Holds a processing slot for the duration of the block.
+
+        Raises:
+            Overloaded: If the request is shed.
+        """
+        self._acquire()
+        try:
+            yield
+        finally:
+            self._release()
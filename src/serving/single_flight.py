@@ -0,0 +1,64 @@
+import threading
+from typing import Any, Callable, Hashable
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical requests: while a computation for a key is in flight,
+    further requests for the same key wait for it and share its result (or its exception)
+    instead of computing it again. Finished computations are not cached.
+
+    Attributes:
+        coalesced (int): Number of requests that were served by another request's computation.
+        executed (int): Number of computations that were run.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self.executed = 0
+        self._calls: dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        """
+        Runs the function, unless a computation for the key is already in flight.
+
+        Args:
+            key (Hashable): Identifies identical requests.
+            function (Callable[[], Any]): Computes the result.
+
+        Returns:
+            Any: The result of the function, possibly computed for another request.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = function()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
@@ -0,0 +1,214 @@
+import os
+import threading
+
+import numpy as np
+
+from src.constants import constants
+
+
+class NeighborGraph:
+    """
+    Precomputed top-k nearest neighbors of every coffee by cosine similarity of the document embeddings.
+
+    The graph is computed with blocked matrix multiplies, so memory stays bounded by
+    block_size x num_documents similarities. Neighbor ids are stored as int32 rows and their
+    scores as float16, and looking up the neighbors of a coffee is a single row read.
+    Single document updates only recompute the rows they affect.
+
+    If a path is given, the normalized embeddings are kept in a memory-mapped float32 file
+    instead of in memory, e.g. next to a quantized index, so only the neighbor ids and scores
+    stay resident.
+
+    Attributes:
+        k (int): Number of neighbors kept per document.
+        block_size (int): Number of rows multiplied at once.
+        path (str | None): File of the memory-mapped embeddings, None to keep them in memory.
+        sources (list[str | None]): Source id of each row, None for deleted rows.
+        rows (dict[str, int]): Row of each live source id.
+        vectors (np.ndarray): Normalized embeddings, one row per document.
+        neighbors (np.ndarray): int32 neighbor rows per document, -1 for empty slots.
+        scores (np.ndarray): float16 cosine similarity of each neighbor.
+    """
+
+    def __init__(self, k: int = constants.similar_k, block_size: int = 1024, path: str | None = None):
+        self.k = k
+        self.block_size = block_size
+        self.path = path
+        self.sources: list[str | None] = []
+        self.rows: dict[str, int] = {}
+        self.size = 0
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.alive = np.zeros(0, dtype=bool)
+        self.neighbors = np.full((0, k), -1, dtype=np.int32)
+        self.scores = np.zeros((0, k), dtype=np.float16)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def build(self, sources: list[str], vectors: list[list[float]] | np.ndarray):
+        """
+        Computes the neighbor lists of all documents.
+
+        Args:
+            sources (list[str]): Source id of each document.
+            vectors (list[list[float]] | np.ndarray): Their embeddings, in the same order.
+        """
+        with self._lock:
+            self.sources = list(sources)
+            self.rows = {source: row for row, source in enumerate(sources)}
+            self.size = len(sources)
+            if self.path is None:
+                self.vectors = self._normalize(vectors).reshape(self.size, -1)
+            else:
+                self.vectors = self._allocate(self.size, np.shape(vectors)[1] if self.size else 0)
+                for start in range(0, self.size, self.block_size):
+                    self.vectors[start:start + self.block_size] = self._normalize(vectors[start:start + self.block_size])
+            self.alive = np.ones(self.size, dtype=bool)
+            self.neighbors = np.full((self.size, self.k), -1, dtype=np.int32)
+            self.scores = np.zeros((self.size, self.k), dtype=np.float16)
+            self._recompute(np.arange(self.size))
+
+    def _recompute(self, rows: np.ndarray):
+        """
+        Recomputes the neighbor lists of the given rows block by block.
+        """
+        for start in range(0, len(rows), self.block_size):
+            block = rows[start:start + self.block_size]
+            similarities = self.vectors[block] @ self.vectors[:self.size].T
+            similarities[:, ~self.alive[:self.size]] = -np.inf
+            similarities[np.arange(len(block)), block] = -np.inf
+
+            k = min(self.k, self.size)
+            if k == 0:
+                continue
+            top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(similarities, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+            valid = np.isfinite(top_scores)
+            self.neighbors[block] = -1
+            self.scores[block] = 0
+            self.neighbors[block, :k] = np.where(valid, top, -1)
+            self.scores[block, :k] = np.where(valid, top_scores, 0)
+
+    def _allocate(self, capacity: int, dimension: int) -> np.ndarray:
+        """
+        Returns a zeroed embedding matrix, or the memory map of the embedding file grown to the
+        capacity, keeping its existing rows.
+        """
+        if self.path is None:
+            return np.zeros((capacity, dimension), dtype=np.float32)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "ab") as f:
+            f.truncate(max(capacity, 1) * 4 * max(dimension, 1))
+        return np.memmap(self.path, dtype=np.float32, mode="r+", shape=(max(capacity, 1), max(dimension, 1)))
+
+    def _grow(self, dimension: int):
+        capacity = max(len(self.alive) * 2, 16)
+        vectors = self._allocate(capacity, dimension)
+        # a grown memory map already holds the existing rows
+        if self.path is None and self.size:
+            vectors[:self.size] = self.vectors[:self.size]
+        self.vectors = vectors
+        self.alive = np.concatenate([self.alive[:self.size], np.zeros(capacity - self.size, dtype=bool)])
+        self.neighbors = np.concatenate(
+            [self.neighbors[:self.size], np.full((capacity - self.size, self.k), -1, dtype=np.int32)]
+        )
+        self.scores = np.concatenate(
+            [self.scores[:self.size], np.zeros((capacity - self.size, self.k), dtype=np.float16)]
+        )
+
+    def _rows_pointing_to(self, row: int) -> np.ndarray:
+        return np.flatnonzero(np.any(self.neighbors[:self.size] == row, axis=1))
+
+    def upsert(self, source: str, vector: list[float] | np.ndarray):
+        """
+        Adds or replaces one document. Recomputes its own neighbors and the neighbor lists
+        it enters or, if its embedding changed, previously belonged to.
+
+        Args:
+            source (str): The source id.
+            vector (list[float] | np.ndarray): The embedding.
+        """
+        vector = self._normalize(vector)
+        with self._lock:
+            row = self.rows.get(source)
+            stale = np.zeros(0, dtype=np.int64)
+            if row is None:
+                if self.size >= len(self.alive):
+                    self._grow(vector.shape[-1])
+                row = self.size
+                self.size += 1
+                self.sources.append(source)
+                self.rows[source] = row
+            else:
+                stale = self._rows_pointing_to(row)
+            self.vectors[row] = vector
+            self.alive[row] = True
+
+            # rows whose weakest neighbor is less similar than the new document
+            similarities = self.vectors[:self.size] @ vector
+            weakest = np.where(
+                self.neighbors[:self.size, -1] >= 0, self.scores[:self.size, -1].astype(np.float32), -np.inf
+            )
+            entering = np.flatnonzero((similarities > weakest) & self.alive[:self.size])
+            affected = np.union1d(np.union1d(stale, entering), [row]).astype(np.int64)
+            self._recompute(affected[self.alive[affected]])
+
+    def delete(self, source: str) -> bool:
+        """
+        Removes one document and recomputes the neighbor lists it belonged to.
+
+        Args:
+            source (str): The source id.
+
+        Returns:
+            bool: True if the document was part of the graph.
+        """
+        with self._lock:
+            row = self.rows.pop(source, None)
+            if row is None:
+                return False
+            self.alive[row] = False
+            self.sources[row] = None
+            self.neighbors[row] = -1
+            affected = self._rows_pointing_to(row)
+            self._recompute(affected[self.alive[affected]])
+            return True
+
+    def similar(self, source: str, k: int = 10) -> list[tuple[str, float]]:
+        """
+        Returns the precomputed nearest neighbors of a document.
+
+        Args:
+            source (str): The source id.
+            k (int): Number of neighbors, at most the k the graph was built with.
+
+        Returns:
+            list[tuple[str, float]]: Source ids and cosine similarities, most similar first.
+        """
+        row = self.rows.get(source)
+        if row is None:
+            return []
+        neighbors = self.neighbors[row, :k]
+        scores = self.scores[row, :k]
+        return [
+            (self.sources[neighbor], float(score))
+            for neighbor, score in zip(neighbors.tolist(), scores.tolist())
+            if neighbor >= 0
+        ]
+
+    def close(self):
+        """
+        Removes the memory-mapped embeddings from disk, if there are any.
+        """
+        with self._lock:
+            self.vectors = np.zeros((0, 0), dtype=np.float32)
+            if self.path is not None and os.path.exists(self.path):
+                os.remove(self.path)
@@ -0,0 +1,203 @@
+import bisect
+import heapq
+import re
+import threading
+import time
+from collections import Counter
+
+from langchain_core.documents import Document
+
+PHRASE_SPLIT_PATTERN = re.compile(r"[,.;:()]")
+CUP_SUFFIX_PATTERN = re.compile(r"\s+in (the )?(aroma|cup|short|long|small cup)\b.*$")
+LEADING_PATTERN = re.compile(r"^(and|with|notes of|hints of)\s+")
+
+
+class PrefixIndex:
+    """
+    A typeahead index over tasting notes, coffee names, roasters and past queries.
+
+    Terms are kept in a lower-cased sorted array, so the completions of a prefix are one
+    contiguous slice found by binary search. The top completions of all short prefixes,
+    whose slices are large, are precomputed, longer prefixes rank their slice directly.
+
+    Searched queries are counted right away, but only merged into the term array and the
+    prefix cache in batches, once flush_size distinct queries are pending or flush_interval
+    seconds have passed. Completions are read under the same lock as the merges.
+
+    Attributes:
+        terms (list[str]): Sorted normalized terms.
+        frequencies (Counter): Frequency of each normalized term.
+        display (dict[str, str]): Display form of each normalized term.
+        query_counts (Counter): How often each past query was searched.
+        max_cached_prefix (int): Prefixes up to this length are served from the cache.
+        max_phrase_words (int): Tasting notes with more words are not indexed.
+        flush_size (int): Number of distinct pending queries that triggers a merge.
+        flush_interval (float): Maximum age in seconds of pending queries before a merge.
+    """
+
+    def __init__(
+            self,
+            max_cached_prefix: int = 3,
+            max_phrase_words: int = 4,
+            cache_size: int = 10,
+            flush_size: int = 64,
+            flush_interval: float = 5.0,
+    ):
+        self.terms: list[str] = []
+        self.frequencies: Counter = Counter()
+        self.display: dict[str, str] = {}
+        self.query_counts: Counter = Counter()
+        self.max_cached_prefix = max_cached_prefix
+        self.max_phrase_words = max_phrase_words
+        self.cache_size = cache_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._top_by_prefix: dict[str, list[str]] = {}
+        self._pending: Counter = Counter()
+        self._pending_display: dict[str, str] = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return re.sub(r"\s+", " ", re.sub(r"^[^a-z0-9]+", "", text.lower())).strip()
+
+    def extract_tasting_notes(self, description: str) -> list[str]:
+        """
+        Splits a flavor description into short tasting-note phrases,
+        e.g. "dark chocolate" or "pink grapefruit zest".
+
+        Args:
+            description (str): The flavor description (desc_1).
+
+        Returns:
+            list[str]: The tasting notes.
+        """
+        notes = []
+        for phrase in PHRASE_SPLIT_PATTERN.split(description):
+            phrase = LEADING_PATTERN.sub("", CUP_SUFFIX_PATTERN.sub("", phrase.strip()).lower())
+            if phrase and len(phrase.split()) <= self.max_phrase_words:
+                notes.append(phrase)
+        return notes
+
+    def _add_terms(self, counts: Counter, display: dict[str, str]):
+        new_terms = [term for term in counts if term not in self.frequencies]
+        self.frequencies.update(counts)
+        for term, text in display.items():
+            self.display.setdefault(term, text)
+
+        if len(new_terms) > len(self.terms) // 4:
+            self.terms = sorted(self.frequencies)
+            self._rebuild_cache()
+        else:
+            self.terms = list(heapq.merge(self.terms, sorted(new_terms)))
+            self._refresh_cache(counts)
+
+    def add_documents(self, documents: list[Document]):
+        """
+        Adds the tasting notes, names and roasters of review documents.
+
+        Args:
+            documents (list[Document]): The review documents.
+        """
+        counts = Counter()
+        display = {}
+        for doc in documents:
+            texts = self.extract_tasting_notes(doc.page_content)
+            texts += [str(doc.metadata.get("name", "")), str(doc.metadata.get("roaster", ""))]
+            for text in texts:
+                term = self.normalize(text)
+                if term:
+                    counts[term] += 1
+                    display.setdefault(term, text.strip())
+
+        with self._lock:
+            self._add_terms(counts, display)
+
+    def add_queries(self, query_counts: Counter | dict[str, int]):
+        """
+        Adds past queries, e.g. the query log of a previous index generation.
+
+        Args:
+            query_counts (Counter | dict[str, int]): How often each query was searched.
+        """
+        counts = Counter({self.normalize(query): count for query, count in query_counts.items()})
+        counts.pop("", None)
+        with self._lock:
+            self.query_counts.update(query_counts)
+            self._add_terms(counts, {self.normalize(query): query.strip() for query in query_counts})
+
+    def record_query(self, query: str):
+        """
+        Records a searched query, so it is suggested for later prefixes once the
+        pending queries are merged.
+
+        Args:
+            query (str): The query as typed by the user.
+        """
+        term = self.normalize(query)
+        if not term:
+            return
+        with self._lock:
+            self.query_counts[query] += 1
+            self._pending[term] += 1
+            self._pending_display.setdefault(term, query.strip())
+            if len(self._pending) >= self.flush_size or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def flush(self):
+        """
+        Merges all pending queries into the term array and the prefix cache.
+        """
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            self._add_terms(self._pending, self._pending_display)
+            self._pending = Counter()
+            self._pending_display = {}
+        self._last_flush = time.monotonic()
+
+    def _rank(self, prefix: str, k: int) -> list[str]:
+        start = bisect.bisect_left(self.terms, prefix)
+        end = bisect.bisect_left(self.terms, prefix + "\uffff", lo=start)
+        return heapq.nlargest(k, self.terms[start:end], key=lambda term: (self.frequencies[term], -len(term)))
+
+    def _rebuild_cache(self):
+        prefixes = {
+            term[:length]
+            for term in self.terms
+            for length in range(1, min(len(term), self.max_cached_prefix) + 1)
+        }
+        self._top_by_prefix = {prefix: self._rank(prefix, self.cache_size) for prefix in prefixes}
+
+    def _refresh_cache(self, counts: Counter):
+        prefixes = {
+            term[:length]
+            for term in counts
+            for length in range(1, min(len(term), self.max_cached_prefix) + 1)
+        }
+        for prefix in prefixes:
+            self._top_by_prefix[prefix] = self._rank(prefix, self.cache_size)
+
+    def complete(self, prefix: str, k: int = 10) -> list[str]:
+        """
+        Returns the most frequent terms starting with the given prefix.
+
+        Args:
+            prefix (str): The typed prefix.
+            k (int): Maximum number of suggestions.
+
+        Returns:
+            list[str]: The suggestions, most frequent first.
+        """
+        prefix = self.normalize(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            if len(prefix) <= self.max_cached_prefix and k <= self.cache_size:
+                top = self._top_by_prefix.get(prefix, [])[:k]
+            else:
+                top = self._rank(prefix, k)
+            return [self.display.get(term, term) for term in top]
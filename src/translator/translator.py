@@ -1,7 +1,6 @@
 import os
+import threading
 
-from google.cloud import translate_v2 as translate
-from google.oauth2 import service_account
 from langchain_core.documents import Document
 
 from src.constants import constants
@@ -9,18 +8,60 @@ from src.constants import constants
 
 class Translator:
 
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """
+        The Google Translate client. The Google Cloud SDK is imported and the client is
+        created on first use, then reused for all later translations.
+        """
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from google.cloud import translate_v2 as translate
+                    from google.oauth2 import service_account
+
+                    credentials = service_account.Credentials.from_service_account_file(
+                        filename=os.path.join(constants.root_dir, "src", "translator", "google_service_credentials.json")
+                    )
+                    self._client = translate.Client(credentials=credentials)
+        return self._client
+
     def translate_text(self, text: str, target_language: str = "en") -> dict:
-        credentials = service_account.Credentials.from_service_account_file(
-            filename=os.path.join(constants.root_dir, "src", "translator", "google_service_credentials.json")
-        )
-        client = translate.Client(credentials=credentials)
-        result = client.translate(text, target_language=target_language)
+        result = self.client.translate(text, target_language=target_language)
 
         return {
             "translated_text": result['translatedText'],
             "detected_source_language": result.get('detectedSourceLanguage', 'unknown')
         }
 
+    def translate_texts(self, texts: list[str], target_language: str = "en", batch_size: int = 100) -> list[dict]:
+        """
+        Translates many texts with one request per batch.
+
+        Args:
+            texts (list[str]): The texts to translate.
+            target_language (str): The language to translate to.
+            batch_size (int): Number of texts per request.
+
+        Returns:
+            list[dict]: The translated text and detected source language of each text.
+        """
+        translations = []
+        for start in range(0, len(texts), batch_size):
+            results = self.client.translate(texts[start:start + batch_size], target_language=target_language)
+            translations.extend(
+                {
+                    "translated_text": result['translatedText'],
+                    "detected_source_language": result.get('detectedSourceLanguage', 'unknown')
+                }
+                for result in results
+            )
+        return translations
+
     def translate_document_fields(self, doc: Document, target_language: str = "en") -> Document:
         # Translate main text
         translated_main = self.translate_text(doc.page_content, target_language=target_language)
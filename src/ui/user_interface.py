@@ -1,7 +1,13 @@
 import streamlit as st
 from src.search_engine.search_engine import SearchEngine
-import matplotlib.pyplot as plt
-import numpy as np
+from src.serving.admission_controller import Overloaded
+
+SORT_LABELS = {
+    "relevance": "Best match",
+    "top_rated": "Top rated",
+    "best_value": "Best value",
+    "newest": "Newest reviews",
+}
 
 
 def _apply_meta_filters(docs, roast_sel: str, origin_sel: str):
@@ -19,6 +25,10 @@ def _apply_meta_filters(docs, roast_sel: str, origin_sel: str):
 
 
 def plot_3axis_radar(dimensions, values, title=None):
+    # matplotlib is only needed for the radar chart, so it is not imported at startup
+    import matplotlib.pyplot as plt
+    import numpy as np
+
     # close the loop
     values = values + values[:1]
     angles = np.linspace(0, 2 * np.pi, len(dimensions), endpoint=False).tolist()
@@ -36,9 +46,15 @@ def plot_3axis_radar(dimensions, values, title=None):
     return fig
 
 
+@st.cache_resource
+def _shared_search_engine() -> SearchEngine:
+    # one engine for all sessions, so concurrent identical searches can be coalesced
+    return SearchEngine()
+
+
 # Initialize RAGChain in session state
 if "rag_chain" not in st.session_state:
-    st.session_state.rag_chain = SearchEngine()
+    st.session_state.rag_chain = _shared_search_engine()
 
 
 # Helper to post-filter retrieved docs
@@ -52,6 +68,25 @@ def _apply_meta_filters(docs, roast_sel, origin_sel):
     return filtered
 
 
+def _apply_suggestion(previous_fragments, suggestion):
+    """
+    Replaces the fragment after the last comma of the query with the chosen suggestion.
+    """
+    fragments = [f.strip() for f in previous_fragments if f.strip()]
+    st.session_state.search_query = ", ".join(fragments + [suggestion])
+
+
+def _active_filters() -> dict[str, str]:
+    """
+    Builds the search filters from the roast and origin selections, skipping 'All'.
+    """
+    selections = {
+        "roast": st.session_state.get("roast_filter", "All"),
+        "origin_2": st.session_state.get("origin_filter", "All"),
+    }
+    return {key: value for key, value in selections.items() if value != "All"}
+
+
 def main():
     st.set_page_config(page_title="CoffeeBeanDream", layout="centered")
     st.title("☕ CoffeeBeanDream")
@@ -73,11 +108,16 @@ def main():
     # ————————————————
     # 2) Build dynamic filter options
     # ————————————————
-    # We use the indexed chunks' metadata to get all roast/origin values:
-    all_roasts = sorted({d.metadata.get("roast", "Unknown") for d in chain.index.chunks})
-    all_origins = sorted({d.metadata.get("origin", "Unknown") for d in chain.index.chunks})
-    roast_options = ["All"] + all_roasts
-    origin_options = ["All"] + all_origins
+    # Facet counts of the last search's candidates, or of the whole catalog before the first
+    # search and whenever the filters differ from those the stored counts were computed with
+    active_filters = _active_filters()
+    facets = st.session_state.get("facets")
+    if not facets or st.session_state.get("facets_filters") != active_filters:
+        facets = chain.facet_counts(active_filters)
+    roast_counts = facets.get("roast", {})
+    origin_counts = facets.get("origin_2", {})
+    roast_options = ["All"] + sorted(set(roast_counts) | {st.session_state.roast_filter} - {"All"})
+    origin_options = ["All"] + sorted(set(origin_counts) | {st.session_state.origin_filter} - {"All"})
 
     # ————————————————
     # 3) Mode toggle
@@ -98,6 +138,20 @@ def main():
             value=st.session_state.search_query,
             placeholder="e.g. fruity, chocolatey, bright acidity"
         )
+
+        # Typeahead suggestions for the fragment after the last comma
+        *previous_fragments, current_fragment = st.session_state.search_query.split(",")
+        suggestions = chain.suggest(current_fragment) if current_fragment.strip() else []
+        if suggestions:
+            suggestion_columns = st.columns(min(len(suggestions), 5), gap="small")
+            for i, suggestion in enumerate(suggestions):
+                with suggestion_columns[i % len(suggestion_columns)]:
+                    st.button(
+                        suggestion,
+                        key=f"suggestion_{i}",
+                        on_click=_apply_suggestion,
+                        args=(previous_fragments, suggestion),
+                    )
         full_query = st.session_state.search_query.strip()
 
     else:
@@ -151,6 +205,8 @@ def main():
                 # clear the filters (and any inputs you want)
                 st.session_state.roast_filter = "All"
                 st.session_state.origin_filter = "All"
+                st.session_state.pop("facets", None)
+                st.session_state.pop("facets_filters", None)
                 st.session_state.pop("search_query", None)
                 for k in ("sweetness", "bitterness", "acidity"):
                     st.session_state.pop(k, None)
@@ -162,6 +218,7 @@ def main():
                 options=roast_options,
                 index=roast_options.index(st.session_state.get("roast_filter", "All")),
                 key="roast_filter",
+                format_func=lambda v: v if v == "All" else f"{v} ({roast_counts.get(v, 0)})",
                 help="Filter by roast level",
             )
         with ctl2:
@@ -170,12 +227,20 @@ def main():
                 options=origin_options,
                 index=origin_options.index(st.session_state.get("origin_filter", "All")),
                 key="origin_filter",
+                format_func=lambda v: v if v == "All" else f"{v} ({origin_counts.get(v, 0)})",
                 help="Filter by country of origin",
             )
 
     # ————————————————
     # 6) Search button
     # ————————————————
+    st.selectbox(
+        "Sort by",
+        options=list(SORT_LABELS),
+        key="sort_mode",
+        format_func=SORT_LABELS.get,
+        help="Rank the matches by relevance alone, or boost well-rated, affordable or recently reviewed coffees",
+    )
     search_clicked = st.button("Search Beans")
 
     # ————————————————
@@ -188,60 +253,71 @@ def main():
             with st.spinner("Searching coffee beans…"):
                 # Retrieve and then post-filter by roast/origin
                 chain = st.session_state.rag_chain
-                roast_filter = st.session_state.get("roast_filter", "All")
-                origin_filter = st.session_state.get("origin_filter", "All")
-
-                # TODO put this into filters dict
-                filters = {
-                    "roast": roast_filter,
-                    #"origin_1": origin_filter
-                }
-
-                docs = chain.search(full_query, {})
-
-                # st.subheader("Recommended Coffees")
-                # if not docs:
-                #     st.info("No beans match those filters.")
-                # for i, d in enumerate(docs, 1):
-                #     m = d.metadata
-                #     st.markdown(f"### {i}. {m.get('name','?')}")
-                #     st.markdown(
-                #         f"**Origin:** {m.get('origin','?')}  \n"
-                #         f"**Roast:** {m.get('roast','?')}  \n"
-                #         f"**Roaster:** {m.get('roaster','?')}"
-                #     )
-                #     with st.expander("Why this match?"):
-                #         st.markdown(chain.explain_match(d, full_query))
-                #     st.markdown("---")
-                st.subheader("Recommended Coffees")
-                for i, d in enumerate(docs, 1):
-                    m = d.metadata
-                    name = m.get("name", "Unknown")
-                    origin = m.get("origin_1", "?")
-                    roast = m.get("roast", "?")
-
-                    # 1) Text info
-                    st.markdown(f"### {i}. {name}")
-                    st.markdown(f"**Origin:** {origin}  \n**Roast:** {roast}")
-
-                    # 2) Radar chart
-                    #   — make sure these keys exist in your metadata as numbers 0–10
-                    dims = ["Sweetness", "Bitterness", "Acidity"]
-                    vals = [
-                        float(m.get("sweetness", 5)),
-                        float(m.get("bitterness", 5)),
-                        float(m.get("acidity", 5)),
-                    ]
-                    # fig = plot_3axis_radar(dims, vals, title=f"{m.get('name','')} Profile")
-                    # st.pyplot(fig)
-
-                    # 3) Explanation
-                    with st.expander("Why this match?"):
-                        explanation = chain.explain_result(full_query, d)
-                        translated_explanation = chain.translator.translate_text(explanation, chain.user_language)["translated_text"]
-                        st.markdown(translated_explanation)
-
-                    st.markdown("---")
+                try:
+                    search_filters = _active_filters()
+                    docs, st.session_state.facets, st.session_state.next_cursor, language = chain.search_with_facets(
+                        full_query, search_filters, sort=st.session_state.sort_mode
+                    )
+                    # the engine is shared by all sessions, so the language of this search is kept per session
+                    st.session_state.results_language = language
+                    st.session_state.facets_filters = search_filters
+                    st.session_state.results = docs
+                    st.session_state.results_query = full_query
+                    st.session_state.explanations = {}
+                except Overloaded:
+                    st.warning("Lots of coffee lovers are searching right now, please try again in a moment.")
+
+    if st.session_state.get("results") is not None:
+        st.subheader("Recommended Coffees")
+        for i, d in enumerate(st.session_state.results, 1):
+            m = d.metadata
+            name = m.get("name", "Unknown")
+            origin = m.get("origin_1", "?")
+            roast = m.get("roast", "?")
+
+            # 1) Text info
+            st.markdown(f"### {i}. {name}")
+            st.markdown(f"**Origin:** {origin}  \n**Roast:** {roast}")
+            st.markdown(f"**Rating:** {m.get('rating', '?')}  \n**Price:** ${m.get('100g_USD', '?')} per 100g")
+
+            # 2) Radar chart
+            #   — make sure these keys exist in your metadata as numbers 0–10
+            dims = ["Sweetness", "Bitterness", "Acidity"]
+            vals = [
+                float(m.get("sweetness", 5)),
+                float(m.get("bitterness", 5)),
+                float(m.get("acidity", 5)),
+            ]
+            # fig = plot_3axis_radar(dims, vals, title=f"{m.get('name','')} Profile")
+            # st.pyplot(fig)
+
+            # 3) Explanation
+            #   — kept per result, so reruns (e.g. "Show more") do not call the LLM again
+            with st.expander("Why this match?"):
+                explanation_key = (st.session_state.results_query, m.get("source"))
+                explanations = st.session_state.setdefault("explanations", {})
+                if explanation_key not in explanations:
+                    try:
+                        explanation = chain.explain_result(st.session_state.results_query, d)
+                        explanations[explanation_key] = chain.translator.translate_text(
+                            explanation, st.session_state.get("results_language", "en")
+                        )["translated_text"]
+                    except Overloaded:
+                        st.info("The explanation is not available right now, please try again in a moment.")
+                if explanation_key in explanations:
+                    st.markdown(explanations[explanation_key])
+
+            st.markdown("---")
+
+        # Further pages are served from the stored ranking of this search
+        if st.session_state.get("next_cursor") and st.button("Show more"):
+            try:
+                more, st.session_state.next_cursor = chain.next_page(st.session_state.next_cursor)
+                st.session_state.results = st.session_state.results + more
+            except KeyError:
+                st.session_state.next_cursor = None
+                st.info("These results have expired, please search again.")
+            st.rerun()
 
     # ————————————————
     # 8) Update Index button